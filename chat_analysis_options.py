@@ -5,7 +5,7 @@ from typing import Dict, Any
 from cli import CLIParser
 from configuration import Config
 from conversation_data import ConversationData
-from pdf_generator import PDFGenerator
+from rate_limiter import RateLimiter
 from trend_processor import TrendProcessor
 
 class ChatAnalysisOptions:
@@ -35,18 +35,26 @@ class ChatAnalysisOptions:
             pdf_chunks=self.args.pdf,
             pdf_output_dir=self.args.pdf_dir,
             pdf_size_limit_mb=self.args.pdf_size_limit,
-            start_date=self.args.date
+            start_date=self.args.date,
+            pack_size=self.args.pack or 1,
+            max_workers=self.args.max_workers or Config.max_workers,
+            use_response_cache=not self.args.no_cache
         )
     
     def export_chat(self) -> None:
         """Export a specific chat conversation."""
         print(f"\nExporting chat {self.args.export_chat}...")
         data = ConversationData(self.config)
-        output_file = data.export_chat_history(self.args.export_chat, self.args.export_format)
+        try:
+            output_file = data.export_chat_history(self.args.export_chat, self.args.export_format)
+        finally:
+            data.close()
         print(f"Chat exported to: {os.path.relpath(output_file)}")
     
     def generate_pdfs(self) -> None:
         """Generate PDF files from markdown analysis."""
+        # Imported here because weasyprint is slow to load and only PDF runs need it
+        from pdf_generator import PDFGenerator
         print(f"\nGenerating {self.args.pdf} PDF files from existing markdown...")
         pdf_gen = PDFGenerator(
             markdown_dir=self.args.output,
@@ -78,55 +86,63 @@ class ChatAnalysisOptions:
             # Use the output directory from config for JSON analysis files
             analyzer = TrendProcessor(
                 output_dir=self.config.research_folder,
-                force_reprocess=self.args.force_reprocess
+                force_reprocess=self.args.force_reprocess,
+                max_workers=self.config.max_workers,
+                rate_limiter=RateLimiter(
+                    self.config.max_requests_per_minute,
+                    self.config.max_tokens_per_minute
+                )
             )
             
-            # Determine the analysis directory (either from --trends or -o)
-            analysis_dir = self.args.trends if self.args.trends else self.args.output
+            try:
+                # Determine the analysis directory (either from --trends or -o)
+                analysis_dir = self.args.trends if self.args.trends else self.args.output
             
-            if self.args.chat_id:
-                # Single chat analysis
-                target_file = os.path.join(analysis_dir, f"{self.args.chat_id}.md")
-                if not os.path.isfile(target_file):
-                    raise FileNotFoundError(f"Chat file not found: {target_file}")
+                if self.args.chat_id:
+                    # Single chat analysis
+                    target_file = os.path.join(analysis_dir, f"{self.args.chat_id}.md")
+                    if not os.path.isfile(target_file):
+                        raise FileNotFoundError(f"Chat file not found: {target_file}")
                     
-                print(f"\nAnalyzing single chat: {self.args.chat_id}")
+                    print(f"\nAnalyzing single chat: {self.args.chat_id}")
                 
-                # Check if we can use existing analysis
-                if not analyzer._should_process_file(target_file):
-                    print(f"Using existing analysis for {self.args.chat_id}")
-                    json_path = os.path.join(
-                        analyzer.output_dir,
-                        f"{self.args.chat_id}.json"
-                    )
-                    with open(json_path, 'r') as f:
-                        stats = json.load(f)
-                else:
-                    stats = analyzer._process_file(target_file)
+                    # Check if we can use existing analysis
+                    if not analyzer._should_process_file(target_file):
+                        print(f"Using existing analysis for {self.args.chat_id}")
+                        json_path = os.path.join(
+                            analyzer.output_dir,
+                            f"{self.args.chat_id}.json"
+                        )
+                        with open(json_path, 'r') as f:
+                            stats = json.load(f)
+                    else:
+                        stats = analyzer._process_file(target_file)
                 
-                print("\nAnalysis Results:")
-                for key, value in stats.items():
-                    if key not in ['raw_analysis', 'summary']:  # Skip verbose fields
-                        print(f"  {key}: {value}")
+                    print("\nAnalysis Results:")
+                    for key, value in stats.items():
+                        if key not in ['raw_analysis', 'summary']:  # Skip verbose fields
+                            print(f"  {key}: {value}")
                     
-            elif analysis_dir:
-                # Full directory analysis
-                print(f"\nAnalyzing trends in: {analysis_dir}")
-                summary = analyzer.analyze_directory(analysis_dir)
+                elif analysis_dir:
+                    # Full directory analysis
+                    print(f"\nAnalyzing trends in: {analysis_dir}")
+                    summary = analyzer.analyze_directory(analysis_dir)
                 
-                print("\nTrends Summary:")
-                for section, data in summary.items():
-                    print(f"\n{section}:")
-                    if isinstance(data, dict):
-                        for key, value in data.items():
-                            if isinstance(value, float):
-                                print(f"  {key}: {value:.2f}")
-                            else:
-                                print(f"  {key}: {value}")
-                    else:
-                        print(f"  {data}")
-            else:
-                print("Error: Must specify either --trends or -o for analysis directory")
+                    print("\nTrends Summary:")
+                    for section, data in summary.items():
+                        print(f"\n{section}:")
+                        if isinstance(data, dict):
+                            for key, value in data.items():
+                                if isinstance(value, float):
+                                    print(f"  {key}: {value:.2f}")
+                                else:
+                                    print(f"  {key}: {value}")
+                        else:
+                            print(f"  {data}")
+                else:
+                    print("Error: Must specify either --trends or -o for analysis directory")
+            finally:
+                analyzer.close()
         except Exception as e:
             print(f"Error analyzing trends: {str(e)}")
     
@@ -135,12 +151,18 @@ class ChatAnalysisOptions:
         print(f"\nInitializing chat analysis...")
         data = ConversationData(self.config)
         
-        if self.args.chat_id:
-            print(f"\nAnalyzing single chat: {self.args.chat_id}")
-            data.analyze_single_chat(self.args.chat_id)
-        else:
-            print(f"\nStarting parallel analysis of all chats...")
-            data.analyze_all_chats_parallel()
+        try:
+            if self.args.chat_id:
+                print(f"\nAnalyzing single chat: {self.args.chat_id}")
+                data.analyze_single_chat(self.args.chat_id)
+            elif self.args.batch:
+                print("\nSubmitting batch analysis of all chats...")
+                data.analyze_all_chats_batch()
+            else:
+                print(f"\nStarting parallel analysis of all chats...")
+                data.analyze_all_chats_parallel()
+        finally:
+            data.close()
         
         print(f"\nAnalysis complete! Results saved to: {self.args.output}")
         if self.args.pdf:
@@ -124,6 +124,26 @@ class CLIParser:
             type=str,
             help='Process a single chat ID for analysis'
         )
+        parser.add_argument(
+            '--batch',
+            action='store_true',
+            help='Submit all chats as OpenAI Batch API jobs (cheaper, but may take up to 24h)'
+        )
+        parser.add_argument(
+            '--pack',
+            type=lambda x: CLIParser._validate_positive_int(x, '--pack'),
+            help='Analyze up to this many small chats per API request (default: 1)'
+        )
+        parser.add_argument(
+            '--max-workers',
+            type=lambda x: CLIParser._validate_positive_int(x, '--max-workers'),
+            help='Maximum number of concurrent OpenAI requests (default: 32)'
+        )
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Re-analyze chats instead of reusing cached analyses of identical conversations'
+        )
         parser.add_argument(
             '--force-reprocess',
             action='store_true',
@@ -6,73 +6,49 @@ from datetime import date
 from typing import Optional
 from dotenv import load_dotenv
 
-@dataclass
-class Config:
-    """Configuration for the conversation analysis.
-    
-    Attributes:
-        convo_folder: Directory containing conversation files (default: 'chats')
-        research_folder: Output directory for analysis files (default: 'analysis')
-        local_tz: Local timezone for timestamp processing (default: 'US/Mountain')
-        openai_api_key: API key for OpenAI services (from env or passed directly)
-        model: GPT model to use for analysis (default: 'gpt-4o')
-        temperature: Temperature setting for GPT responses (default: 0.2)
-        max_workers: Maximum number of parallel workers (default: min(8, CPU_COUNT))
-        pdf_chunks: Number of PDF files to split analysis into (default: None)
-        pdf_output_dir: Directory for PDF output files (default: 'pdf_analysis')
-        pdf_size_limit_mb: Maximum size in MB for each PDF file (default: 1)
-    """
-    # Paths (with defaults)
-    convo_folder: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'chats')
-    research_folder: str = 'analysis'
-    
-    # Timezone settings
-    local_tz: str = 'US/Mountain'
-    
-    # OpenAI settings
-    openai_api_key: Optional[str] = None
-    model: str = 'gpt-4o'
-    trend_analysis_model: str = 'gpt-4o-mini'
-    temperature: float = 0.2
-    
-    # Analysis prompts
-    trend_analysis_prompt: str = (
-        "You are an expert trend analyst evaluating AI conversations. Your task is to analyze the chat summary "
-        "and determine:\n\n"
-        "1. How Often Was the Full AI Decision Loop Followed?\n"
-        "   - Did the user complete a loop?\n"
-        "   - If the user did not complete the loop did they exit after the first step?\n"
-        "   - If the loop was iterated was critical validation skipped?\n\n"
-        "2. Where Does the Loop Break Down?\n"
-        "   - If the loop was not completed and user make it past step 1 what step did they exit at?\n"
-        "   - Failure reason if loop not completed.\n\n"
-        "3. Insights\n"
-        "   - Did the user apply any novel patterns?\n"
-        "   - Did the user use AI as a partner in thought?\n"
-        "   - Did the user leverage AI as a critic to evaluate and improve solutions?\n"
-        "   - Did the user demonstrate AI-driven decision intelligence by incorporating AI insights into their decision-making?\n\n"
-        "You MUST respond with a JSON object in EXACTLY this format:\n"
-        "{\n"
-        "  \"loop_completion\": {\n"
-        "    \"completed\": boolean,\n"
-        "    \"exit_at_step_one\": boolean,\n"
-        "    \"skipped_validation\": boolean\n"
-        "  },\n"
-        "  \"breakdown\": {\n"
-        "    \"exit_step\": string,  // must be one of: \"none\", \"problem_framing\", \"solution_design\", \"implementation\", \"testing_validation\", \"iteration\"\n"
-        "    \"failure_reason\": string  // brief explanation if not completed, \"none\" if completed\n"
-        "  },\n"
-        "  \"insights\": {\n"
-        "    \"novel_patterns\": boolean,\n"
-        "    \"ai_partnership\": boolean,\n"
-        "    \"ai_as_critic\": boolean,\n"
-        "    \"decision_intelligence\": boolean\n"
-        "  }\n"
-        "}\n\n"
-        "DO NOT include any other text in your response, ONLY the JSON object."
-    )
-    
-    system_prompt: str = '''You are an expert system analyst focused on evaluating how effectively users interact with AI systems, ensuring compliance with guidelines, identifying the variations applied in each step of the AI Decision Loop, and tracking collaborative work patterns. Analyze the USER's behavior in the following conversation.
+# Read .env once at import; load_dotenv searches the filesystem for the file,
+# so doing it per Config instance is wasted work
+load_dotenv()
+
+# Analysis prompts. Kept as module constants so every request sends a
+# byte-identical prefix, which lets OpenAI's automatic prompt caching apply.
+TREND_ANALYSIS_PROMPT = (
+    "You are an expert trend analyst evaluating AI conversations. Your task is to analyze the chat summary "
+    "and determine:\n\n"
+    "1. How Often Was the Full AI Decision Loop Followed?\n"
+    "   - Did the user complete a loop?\n"
+    "   - If the user did not complete the loop did they exit after the first step?\n"
+    "   - If the loop was iterated was critical validation skipped?\n\n"
+    "2. Where Does the Loop Break Down?\n"
+    "   - If the loop was not completed and user make it past step 1 what step did they exit at?\n"
+    "   - Failure reason if loop not completed.\n\n"
+    "3. Insights\n"
+    "   - Did the user apply any novel patterns?\n"
+    "   - Did the user use AI as a partner in thought?\n"
+    "   - Did the user leverage AI as a critic to evaluate and improve solutions?\n"
+    "   - Did the user demonstrate AI-driven decision intelligence by incorporating AI insights into their decision-making?\n\n"
+    "You MUST respond with a JSON object in EXACTLY this format:\n"
+    "{\n"
+    "  \"loop_completion\": {\n"
+    "    \"completed\": boolean,\n"
+    "    \"exit_at_step_one\": boolean,\n"
+    "    \"skipped_validation\": boolean\n"
+    "  },\n"
+    "  \"breakdown\": {\n"
+    "    \"exit_step\": string,  // must be one of: \"none\", \"problem_framing\", \"solution_design\", \"implementation\", \"testing_validation\", \"iteration\"\n"
+    "    \"failure_reason\": string  // brief explanation if not completed, \"none\" if completed\n"
+    "  },\n"
+    "  \"insights\": {\n"
+    "    \"novel_patterns\": boolean,\n"
+    "    \"ai_partnership\": boolean,\n"
+    "    \"ai_as_critic\": boolean,\n"
+    "    \"decision_intelligence\": boolean\n"
+    "  }\n"
+    "}\n\n"
+    "DO NOT include any other text in your response, ONLY the JSON object."
+)
+
+SYSTEM_PROMPT = '''You are an expert system analyst focused on evaluating how effectively users interact with AI systems, ensuring compliance with guidelines, identifying the variations applied in each step of the AI Decision Loop, and tracking collaborative work patterns. Analyze the USER's behavior in the following conversation.
 
 IMPORTANT: Your response MUST contain ALL of the following section headings EXACTLY as shown, with no modifications or omissions. Each section must contain meaningful analysis, not placeholder text. The format will be validated by an automated system that requires these exact headings:
 
@@ -154,9 +130,62 @@ YOU MUST USE THE EXACT SECTION HEADINGS AND FORMAT PROVIDED BELOW:
 - [Strategic adjustments to enhance outcomes]
 
 You must maintain this exact structure and these exact headings in your response. Replace the text in brackets with your analysis while keeping the heading hierarchy and formatting consistent.'''
+
+@dataclass
+class Config:
+    """Configuration for the conversation analysis.
+    
+    Attributes:
+        convo_folder: Directory containing conversation files (default: 'chats')
+        research_folder: Output directory for analysis files (default: 'analysis')
+        local_tz: Local timezone for timestamp processing (default: 'US/Mountain')
+        openai_api_key: API key for OpenAI services (from env or passed directly)
+        model: GPT model to use for analysis (default: 'gpt-4o')
+        temperature: Temperature setting for GPT responses (default: 0.2)
+        max_workers: Maximum number of concurrent analysis requests (default: 32)
+        max_requests_per_minute: OpenAI request rate limit (default: 5000)
+        max_tokens_per_minute: OpenAI token rate limit (default: 450000)
+        pack_size: Maximum number of small chats analyzed per request (default: 1, no packing)
+        pack_max_chars: Maximum combined transcript size of a packed request (default: 40000)
+        stream_responses: Stream each analysis to disk as it is generated (default: False)
+        use_response_cache: Reuse analyses of identical transcripts from earlier runs (default: True)
+        pdf_chunks: Number of PDF files to split analysis into (default: None)
+        pdf_output_dir: Directory for PDF output files (default: 'pdf_analysis')
+        pdf_size_limit_mb: Maximum size in MB for each PDF file (default: 1)
+    """
+    # Paths (with defaults)
+    convo_folder: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'chats')
+    research_folder: str = 'analysis'
+    
+    # Timezone settings
+    local_tz: str = 'US/Mountain'
+    
+    # OpenAI settings
+    openai_api_key: Optional[str] = None
+    model: str = 'gpt-4o'
+    trend_analysis_model: str = 'gpt-4o-mini'
+    temperature: float = 0.2
+    
+    # Analysis prompts
+    trend_analysis_prompt: str = TREND_ANALYSIS_PROMPT
+    system_prompt: str = SYSTEM_PROMPT
     
     # Processing settings
-    max_workers: int = min(8, os.cpu_count() or 4)  # Limit to 8 or CPU count, whichever is smaller
+    max_workers: int = 32  # Requests are network-bound, so this is not tied to CPU count
+    
+    # Rate limits (defaults match OpenAI usage tier 2 for gpt-4o)
+    max_requests_per_minute: int = 5000
+    max_tokens_per_minute: int = 450000
+    
+    # Request packing (several small chats share one request and system prompt)
+    pack_size: int = 1
+    pack_max_chars: int = 40000
+    
+    # Write analyses to disk token by token instead of waiting for the full response
+    stream_responses: bool = False
+    
+    # Reuse analyses from <research_folder>/.cache for byte-identical transcripts
+    use_response_cache: bool = True
     
     # Analysis settings
     start_date: Optional[date] = None
@@ -168,7 +197,6 @@ You must maintain this exact structure and these exact headings in your response
 
     def __post_init__(self) -> None:
         """Initialize configuration with environment variables."""
-        load_dotenv()
         if self.openai_api_key is None:
             self.openai_api_key = os.getenv('OPENAI_API_KEY')
             if not self.openai_api_key:
@@ -1,16 +1,91 @@
 """Handles loading and processing of conversation data."""
 
 import concurrent.futures
+import contextlib
+import functools
+import hashlib
 import inspect
+import io
 import json
+import logging
 import os
+import random
+import shutil
+import threading
+import time
 from datetime import datetime
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, Iterator, List, Set, Tuple, Optional, Any
+from zoneinfo import ZoneInfo
 
-from openai import OpenAI
+import httpx
+import ijson
+import orjson
+import tiktoken
+from openai import APIConnectionError, APITimeoutError, InternalServerError, OpenAI, RateLimitError
 
 from configuration import Config
-from pdf_generator import PDFGenerator
+from file_validator import StreamingContentCheck
+from http_client import REQUEST_TIMEOUT_SECONDS, create_http_client
+from rate_limiter import RateLimiter
+
+# Batch API polling (seconds between status checks, doubled after each check)
+BATCH_POLL_INITIAL_SECONDS = 10
+BATCH_POLL_MAX_SECONDS = 300
+BATCH_TERMINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+# Records submitted batches in the output directory until their results are saved
+BATCH_STATE_FILE = 'batch_state.json'
+# Batch API limits on a single batch's input file
+BATCH_MAX_REQUESTS = 50000
+BATCH_MAX_FILE_BYTES = 200 * 1024 * 1024
+
+# Conversations over this many tokens are skipped (OpenAI's max context is
+# 128k for 4o, so stay under that)
+MAX_CONVERSATION_TOKENS = 120000
+# No real transcript averages 10 characters per token, so formatting stops
+# once a transcript passes this length instead of building and tokenizing
+# the whole of a conversation that will be skipped anyway
+MAX_TRANSCRIPT_CHARS = MAX_CONVERSATION_TOKENS * 10
+
+# Exports larger than this are parsed incrementally; smaller ones are read
+# whole, which is several times faster
+STREAM_PARSE_MIN_BYTES = 100 * 1024 * 1024
+
+# First line of every saved analysis records a hash of the transcript it was
+# generated from, so changed conversations can be detected and re-analyzed
+ANALYSIS_HASH_PREFIX = '<!-- h='
+ANALYSIS_HASH_SUFFIX = ' -->'
+
+# Retries for requests rejected with HTTP 429 (exponential backoff with jitter)
+RATE_LIMIT_MAX_RETRIES = 6
+RATE_LIMIT_MAX_BACKOFF_SECONDS = 60
+# Retries for requests that time out, fail to connect or hit a 5xx error
+TRANSIENT_ERROR_MAX_RETRIES = 2
+
+# Instructions for requests that pack several small chats together
+PACK_INSTRUCTIONS = (
+    "Below are {count} separate conversations. Each one starts with a line of "
+    "the form \"===CHAT <id>===\". Analyze each conversation on its own using "
+    "the required format. Respond with a JSON object that maps each chat id to "
+    "its complete markdown analysis, and nothing else.\n\n"
+)
+
+class locked_cached_property(functools.cached_property):
+    """cached_property that computes its value at most once across threads.
+
+    functools.cached_property stopped locking in Python 3.12, so worker
+    threads touching a lazily created client at the same moment would each
+    build their own. Once the value is cached the lock is never taken again.
+    """
+
+    def __init__(self, func):
+        super().__init__(func)
+        self.lock = threading.RLock()
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        with self.lock:
+            return super().__get__(instance, owner)
 
 class ConversationData:
     """Handles loading and processing of conversation data."""
@@ -22,7 +97,92 @@ class ConversationData:
             config: Application configuration
         """
         self.config = config
-        self.openai_client = OpenAI()
+        self.local_tz = ZoneInfo(config.local_tz)
+        # Built once so every request starts with the same system message
+        self.system_message = {"role": "system", "content": config.system_prompt}
+        # Response cache keys share the model and system prompt prefix, so hash
+        # it once and extend a copy with each transcript
+        self.cache_key_prefix = hashlib.sha256(
+            f"{config.model}\0{config.system_prompt}\0".encode('utf-8')
+        )
+        # Prompt token usage across all requests, to report the prompt cache hit rate
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0
+        self._usage_lock = threading.Lock()
+        # One lock per response cache entry in use, with the number of workers
+        # holding or waiting for it, so identical conversations are never sent
+        # to OpenAI at the same time
+        self._cache_entry_locks: Dict[str, List[Any]] = {}
+        self._cache_entry_locks_guard = threading.Lock()
+        # Response cache entries written by this run, the only ones reused
+        # when config.use_response_cache is off
+        self._refreshed_cache_paths: Set[str] = set()
+        self.rate_limiter = RateLimiter(
+            config.max_requests_per_minute,
+            config.max_tokens_per_minute
+        )
+
+    @locked_cached_property
+    def http_client(self) -> httpx.Client:
+        """Pooled HTTP client shared by every worker thread.
+
+        Created on first use, so commands that never call OpenAI (such as
+        exporting a chat) don't pay for it.
+        """
+        return create_http_client(self.config.max_workers)
+
+    @locked_cached_property
+    def openai_client(self) -> OpenAI:
+        """OpenAI client, created on first use.
+        
+        The SDK's own retries are turned off because _create_completion
+        applies the retry policy; both together would multiply attempts.
+        """
+        return OpenAI(http_client=self.http_client, max_retries=0)
+
+    @locked_cached_property
+    def _token_encoding(self) -> Optional[tiktoken.Encoding]:
+        """Tokenizer for the configured model, loaded once and shared by all threads.
+        
+        None if the encoding can't be loaded (tiktoken downloads it on first
+        use), in which case token counts fall back to an estimate.
+        """
+        try:
+            try:
+                return tiktoken.encoding_for_model(self.config.model)
+            except KeyError:
+                # Model name tiktoken doesn't know yet
+                return tiktoken.get_encoding('o200k_base')
+        except Exception as e:
+            # Estimates decide which chats are skipped as too large, so say so
+            logging.warning(f"Could not load tokenizer, estimating token counts "
+                            f"at 4 characters per token: {str(e)}")
+            return None
+
+    @locked_cached_property
+    def _system_prompt_tokens(self) -> int:
+        """Token count of the system prompt sent with every request."""
+        return self._count_tokens(self.config.system_prompt)
+
+    def _count_tokens(self, text: str) -> int:
+        """Count the tokens in a piece of text.
+        
+        Args:
+            text: Text to count
+            
+        Returns:
+            Token count, or ~4 characters per token if no tokenizer is available
+        """
+        encoding = self._token_encoding
+        if encoding is None:
+            return len(text) // 4
+        return len(encoding.encode(text, disallowed_special=()))
+
+    def close(self) -> None:
+        """Close the pooled HTTP connections used for OpenAI requests."""
+        # Nothing to close if no request was ever made
+        if 'http_client' in self.__dict__:
+            self.http_client.close()
 
     def analyze_single_chat(self, chat_id: str) -> None:
         """Analyze a single chat conversation.
@@ -30,17 +190,16 @@ class ConversationData:
         Args:
             chat_id: ID of the chat to analyze
         """
-        # Load chat data
-        chat_data = self._load_chat_data()
-        
-        if chat_id not in chat_data:
+        # Stream the export until the target chat is found; no other chat is
+        # flattened or kept in memory
+        messages = next((m for _, m in self._iter_chat_data(chat_id)), None)
+        if messages is None:
             raise ValueError(f"Chat ID {chat_id} not found in conversation data")
             
         # Create output directory
         os.makedirs(self.config.research_folder, exist_ok=True)
         
         # Analyze the single chat
-        messages = chat_data[chat_id]
         filepath, status = self.analyze_and_save_chat(
             chat_id,
             messages,
@@ -63,27 +222,364 @@ class ConversationData:
         """
         filepath = os.path.join(output_dir, f"{chat_id}.md")
         
-        # Skip if file already exists
-        if os.path.exists(filepath):
-            print(f"Skipping chat {chat_id} - analysis already exists")
+        # Check if we're in single chat mode by looking at the call stack
+        caller_frame = inspect.currentframe().f_back
+        is_single_chat = caller_frame and caller_frame.f_code.co_name == 'analyze_single_chat'
+        
+        # Prepare conversation for analysis, encoding it once for both the
+        # content hash and the response cache key
+        conversation = self._format_conversation(messages, debug=is_single_chat,
+                                                  max_chars=MAX_TRANSCRIPT_CHARS)
+        if conversation is None:
+            print(f"Skipping chat {chat_id} - conversation exceeds {MAX_CONVERSATION_TOKENS} token limit")
             return filepath, 'skipped'
+        encoded = conversation.encode('utf-8')
+        content_hash = self._content_hash(encoded)
+        
+        # Skip if an analysis of this exact conversation already exists
+        if os.path.exists(filepath):
+            if self._is_analysis_current(filepath, content_hash):
+                print(f"Skipping chat {chat_id} - analysis already exists")
+                return filepath, 'skipped'
+            print(f"Re-analyzing chat {chat_id} - conversation changed since last analysis")
             
-        # Estimate token count (rough heuristic)
-        estimated_tokens = sum(len(str(msg)) / 4 for msg in messages)
-        if estimated_tokens > 120000:  # OpenAI's max context is 128k for 4o say under this
-            print(f"Skipping chat {chat_id} - estimated {int(estimated_tokens)} tokens exceeds limit")
+        # Count the transcript's tokens
+        conversation_tokens = self._count_tokens(conversation)
+        if conversation_tokens > MAX_CONVERSATION_TOKENS:
+            print(f"Skipping chat {chat_id} - estimated {conversation_tokens} tokens exceeds limit")
             return filepath, 'skipped'
         
+        # Reuse the analysis of a byte-identical conversation if one is cached.
+        # Identical chats are analyzed one at a time, so a duplicate waits for
+        # the first one's response and copies it instead of paying for another.
+        cache_path = self._cache_path(encoded, output_dir)
+        with self._cache_entry_lock(cache_path):
+            if self._has_cached_analysis(cache_path):
+                self._atomic_copy(cache_path, filepath)
+                if is_single_chat:
+                    print(f"Using cached analysis for identical conversation: {cache_path}")
+                return filepath, 'success'
         
-        # Prepare conversation for analysis
-        conversation = ""
+            # Print debug info before OpenAI call
+            if is_single_chat:
+                print("\nPreparing to call OpenAI API...")
+                print(f"Total conversation length: {len(conversation)} characters")
+                print(f"Estimated tokens: {conversation_tokens}")
         
-        # Check if we're in single chat mode by looking at the call stack
-        import inspect
-        caller_frame = inspect.currentframe().f_back
-        is_single_chat = caller_frame and caller_frame.f_code.co_name == 'analyze_single_chat'
+            return self._cache_analysis(
+                self._request_analysis(chat_id, conversation, output_dir, content_hash,
+                                       conversation_tokens, debug=is_single_chat),
+                cache_path
+            )
+
+    def _request_analysis(self, chat_id: str, conversation: str, output_dir: str,
+                          content_hash: str, conversation_tokens: int,
+                          debug: bool = False) -> Tuple[str, str]:
+        """Request the analysis of one transcript and save it.
+        
+        Args:
+            chat_id: ID of the chat to analyze
+            conversation: Transcript produced by _format_conversation
+            output_dir: Directory to save analysis results
+            content_hash: Transcript hash from _content_hash, recorded in the analysis
+            conversation_tokens: Token count of the transcript
+            debug: If True, print progress and the analysis if it fails validation
+            
+        Returns:
+            Tuple of (output filepath, status)
+        """
+        filepath = os.path.join(output_dir, f"{chat_id}.md")
+        
+        # Analyze with OpenAI
+        try:
+            if debug:
+                print("Calling OpenAI API...")
+            
+            estimated_tokens = self._system_prompt_tokens + conversation_tokens
+            
+            try:
+                if self.config.stream_responses:
+                    return self._stream_analysis(chat_id, conversation, output_dir, content_hash,
+                                                 estimated_tokens, debug=debug)
+                
+                response = self._create_completion(
+                    estimated_tokens,
+                    model=self.config.model,
+                    messages=self._build_messages(conversation),
+                    temperature=self.config.temperature
+                )
+                
+                self._record_usage(response.usage, estimated_tokens)
+                
+                if debug:
+                    print("OpenAI API call completed successfully")
+                
+                # Save analysis to markdown file
+                analysis = response.choices[0].message.content
+                
+            except APITimeoutError:
+                print(f"Error: API call timed out after {REQUEST_TIMEOUT_SECONDS:.0f} seconds")
+                return filepath, 'api_error'
+            except KeyboardInterrupt:
+                print("\nOperation cancelled by user")
+                return filepath, 'cancelled'
+            except Exception as e:
+                print(f"Error during API call: {str(e)}")
+                return filepath, 'api_error'
+            
+            # Only create directory and write file if we have valid analysis
+            if analysis:
+                return self._save_analysis(chat_id, analysis, output_dir, debug=debug,
+                                           content_hash=content_hash)
+            
+            return filepath, 'api_error'
+        
+        except Exception as e:
+            print(f"Error analyzing chat {chat_id}: {str(e)}")
+            # Don't create the file if analysis failed
+            return filepath, 'api_error'
+
+    def _create_completion(self, estimated_tokens: float, **kwargs: Any) -> Any:
+        """Create a chat completion, retrying rate limits and connection or server errors.
+        
+        Every attempt, retries included, first waits for rate limiter capacity.
+        
+        Args:
+            estimated_tokens: Tokens to reserve from the rate limiter per attempt
+            **kwargs: Arguments for chat.completions.create
+            
+        Returns:
+            The chat completion (or stream) returned by OpenAI
+            
+        Raises:
+            RateLimitError: If the request is still rate limited after all retries,
+                or at once if the account is out of quota
+            APITimeoutError: If the request times out; it is not resent, since
+                OpenAI may still be generating (and billing) the response
+            APIConnectionError: If the request still can't connect after all retries
+            InternalServerError: If OpenAI still returns a 5xx error after all retries
+        """
+        rate_limited = 0
+        failed = 0
+        while True:
+            self.rate_limiter.acquire(estimated_tokens)
+            try:
+                return self.openai_client.chat.completions.create(**kwargs)
+            except RateLimitError as e:
+                # Exhausted quota is reported as a rate limit but never recovers
+                if (rate_limited == RATE_LIMIT_MAX_RETRIES or
+                        getattr(e, 'code', None) == 'insufficient_quota'):
+                    raise
+                attempt = rate_limited
+                rate_limited += 1
+                error = e
+            except APITimeoutError:
+                raise
+            except (APIConnectionError, InternalServerError) as e:
+                if failed == TRANSIENT_ERROR_MAX_RETRIES:
+                    raise
+                attempt = failed
+                failed += 1
+                error = e
+            
+            # Honor the server's Retry-After when given, otherwise wait a random
+            # time up to an exponentially growing cap, so threads that failed
+            # together do not retry together
+            cap = min(RATE_LIMIT_MAX_BACKOFF_SECONDS, 2 ** attempt)
+            delay = self._retry_after(error)
+            time.sleep(random.uniform(0, cap) if delay is None else delay)
+
+    def _retry_after(self, error: Exception) -> Optional[float]:
+        """Get the wait in seconds an error response asked for, if any.
+        
+        Args:
+            error: Exception raised by the OpenAI client
+            
+        Returns:
+            The Retry-After header in seconds (capped at
+            RATE_LIMIT_MAX_BACKOFF_SECONDS), or None if absent or not a number
+        """
+        headers = getattr(getattr(error, 'response', None), 'headers', None)
+        value = headers.get('retry-after') if headers is not None else None
+        if not isinstance(value, str):
+            return None
+        try:
+            return min(max(float(value), 0.0), RATE_LIMIT_MAX_BACKOFF_SECONDS)
+        except ValueError:
+            return None
+
+    def _record_usage(self, usage: Any, estimated_tokens: float = 0) -> None:
+        """Add a response's prompt token usage to the running totals.
+        
+        Args:
+            usage: The usage object of a chat completion, if any
+            estimated_tokens: Tokens reserved from the rate limiter for the
+                request, corrected here to the reported total
+        """
+        total_tokens = getattr(usage, 'total_tokens', None)
+        if estimated_tokens and isinstance(total_tokens, int):
+            self.rate_limiter.reconcile(estimated_tokens, total_tokens)
+        
+        prompt_tokens = getattr(usage, 'prompt_tokens', None)
+        if not isinstance(prompt_tokens, int):
+            return
+        details = getattr(usage, 'prompt_tokens_details', None)
+        cached_tokens = getattr(details, 'cached_tokens', None)
+        with self._usage_lock:
+            self.prompt_tokens += prompt_tokens
+            if isinstance(cached_tokens, int):
+                self.cached_prompt_tokens += cached_tokens
+
+    def _content_hash(self, encoded: bytes) -> str:
+        """Get the short hash recorded on the first line of a saved analysis.
+
+        Args:
+            encoded: UTF-8 encoded transcript produced by _format_conversation
+
+        Returns:
+            First 16 hex digits of the SHA-256 of the transcript
+        """
+        return hashlib.sha256(encoded).hexdigest()[:16]
+
+    def _is_analysis_current(self, filepath: str, content_hash: str) -> bool:
+        """Check whether a saved analysis was generated from this transcript.
+
+        Args:
+            filepath: Path of the saved analysis
+            content_hash: Transcript hash from _content_hash
+
+        Returns:
+            False if the analysis records a different transcript hash. Analyses
+            saved without a hash are treated as current.
+        """
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                first_line = f.readline().rstrip('\n')
+        except OSError:
+            return False
+
+        if not (first_line.startswith(ANALYSIS_HASH_PREFIX) and
+                first_line.endswith(ANALYSIS_HASH_SUFFIX)):
+            return True
+        stored_hash = first_line[len(ANALYSIS_HASH_PREFIX):-len(ANALYSIS_HASH_SUFFIX)]
+        return stored_hash == content_hash
+
+    def _cache_path(self, encoded: bytes, output_dir: str) -> str:
+        """Get the response cache path for a conversation transcript.
+        
+        Args:
+            encoded: UTF-8 encoded transcript produced by _format_conversation
+            output_dir: Directory analysis results are saved to
+            
+        Returns:
+            Path of the cached analysis, keyed by the SHA-256 of the model,
+            system prompt and transcript
+        """
+        key = self.cache_key_prefix.copy()
+        key.update(encoded)
+        return os.path.join(output_dir, '.cache', f"{key.hexdigest()}.md")
+
+    def _has_cached_analysis(self, cache_path: str) -> bool:
+        """Check whether a response cache entry can be reused.
         
-        if is_single_chat:
+        With config.use_response_cache off, only entries written during this
+        run count, so stale analyses are redone while identical chats still
+        share one request.
+        
+        Args:
+            cache_path: Cache path from _cache_path
+            
+        Returns:
+            True if the cached analysis should be copied instead of requested
+        """
+        if not self.config.use_response_cache and cache_path not in self._refreshed_cache_paths:
+            return False
+        return os.path.exists(cache_path)
+
+    @contextlib.contextmanager
+    def _cache_entry_lock(self, cache_path: str) -> Iterator[None]:
+        """Hold the lock that serializes analysis of one response cache entry.
+        
+        The lock is dropped once no worker holds or waits for it, so the
+        table only grows with the chats currently in flight.
+        
+        Args:
+            cache_path: Cache path from _cache_path
+        """
+        with self._cache_entry_locks_guard:
+            entry = self._cache_entry_locks.get(cache_path)
+            if entry is None:
+                entry = self._cache_entry_locks[cache_path] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._cache_entry_locks_guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._cache_entry_locks[cache_path]
+
+    def _cache_analysis(self, result: Tuple[str, str], cache_path: str) -> Tuple[str, str]:
+        """Copy a successfully saved analysis into the response cache.
+        
+        Args:
+            result: (output filepath, status) returned by the save step
+            cache_path: Cache path from _cache_path
+            
+        Returns:
+            The unchanged result
+        """
+        filepath, status = result
+        if status == 'success':
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            self._atomic_copy(filepath, cache_path)
+            self._refreshed_cache_paths.add(cache_path)
+        return result
+
+    def _atomic_copy(self, src: str, dst: str) -> None:
+        """Copy a file so that dst is either absent or complete, never partial.
+        
+        The copy is a hard link where the filesystem allows it, so the
+        response cache does not store every analysis a second time. Analyses
+        are always replaced rather than edited in place, so a change to one
+        link never shows through the other.
+        
+        Args:
+            src: File to copy
+            dst: Destination path
+        """
+        temp_path = f"{dst}.{os.urandom(8).hex()}.tmp"
+        try:
+            try:
+                os.link(src, temp_path)
+            except OSError:
+                # No hard links here (e.g. FAT, or another device), so copy the bytes
+                with open(src, 'rb') as f, open(temp_path, 'xb') as tmp:
+                    shutil.copyfileobj(f, tmp)
+            os.replace(temp_path, dst)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(temp_path)
+            raise
+
+    def _format_conversation(self, messages: List[Dict[str, Any]], debug: bool = False,
+                             max_chars: Optional[int] = None) -> Optional[str]:
+        """Flatten chat messages into the plain-text transcript sent for analysis.
+        
+        Args:
+            messages: List of chat messages
+            debug: If True, print each message as it is processed
+            max_chars: Stop early and return None once the transcript is longer than this
+            
+        Returns:
+            Transcript with one "role: text" line per message, or None if it
+            exceeds max_chars
+        """
+        lines = []
+        length = 0
+        
+        if debug:
             print("\nDebug - Processing chat messages:")
             print(f"Found {len(messages)} messages")
             print("Starting message processing...")
@@ -111,139 +607,486 @@ class ConversationData:
                 text = content.get('text')
             
             if text:
-                if is_single_chat:
+                if debug:
                     print(f"\nMessage:")
                     print(f"  Role: {role}")
                     print(f"  Type: {content_type}")
                     print(f"  Content: {text[:200]}..." if len(text) > 200 else f"  Content: {text}")
-                conversation += f"{role}: {text}\n"
+                line = f"{role}: {text}\n"
+                length += len(line)
+                if max_chars is not None and length > max_chars:
+                    return None
+                lines.append(line)
         
-        # Print debug info before OpenAI call
-        if is_single_chat:
-            print("\nPreparing to call OpenAI API...")
-            print(f"Total conversation length: {len(conversation)} characters")
-            token_estimate = len(conversation.split()) * 1.3  # Rough estimate
-            print(f"Estimated tokens: {int(token_estimate)}")
+        return ''.join(lines)
+
+    def _build_messages(self, conversation: str) -> List[Dict[str, str]]:
+        """Build the chat completion messages for a conversation transcript.
         
-        # Analyze with OpenAI
+        Args:
+            conversation: Transcript produced by _format_conversation
+            
+        Returns:
+            System and user messages for the analysis request
+        """
+        return [self.system_message, {"role": "user", "content": conversation}]
+
+    def _save_analysis(self, chat_id: str, analysis: str, output_dir: str,
+                       debug: bool = False, content_hash: Optional[str] = None) -> Tuple[str, str]:
+        """Validate a generated analysis and save it as markdown.
+        
+        Args:
+            chat_id: ID of the analyzed chat
+            analysis: Markdown analysis returned by the model
+            output_dir: Directory to save analysis results
+            debug: If True, print the analysis when it fails validation
+            content_hash: Transcript hash to record on the first line, if any
+            
+        Returns:
+            Tuple of (output filepath, status)
+        """
+        filepath = os.path.join(output_dir, f"{chat_id}.md")
+        
+        # Validate in memory so invalid analyses are never written to disk
+        from file_validator import FileValidator
+        if not FileValidator.verify_md_content(analysis, filepath):
+            return self._reject_analysis(chat_id, analysis, filepath, debug=debug)
+        
+        if content_hash:
+            analysis = f"{ANALYSIS_HASH_PREFIX}{content_hash}{ANALYSIS_HASH_SUFFIX}\n{analysis}"
+        
+        # Write to a temporary file first (callers create output_dir) so the
+        # analysis only appears once it is complete
+        temp_filepath = filepath + '.tmp'
+        self._write_bytes(temp_filepath, analysis.encode('utf-8'))
+        os.replace(temp_filepath, filepath)
+        return filepath, 'success'
+
+    def _write_bytes(self, filepath: str, payload: bytes) -> None:
+        """Write an encoded file with raw os.write calls, bypassing the text layer.
+        
+        Args:
+            filepath: Path of the file to create or truncate
+            payload: Complete file contents
+        """
+        fd = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
         try:
-            if is_single_chat:
-                print("Calling OpenAI API...")
+            view = memoryview(payload)
+            # os.write may write less than asked, so loop until done
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+
+    def _stream_analysis(self, chat_id: str, conversation: str, output_dir: str,
+                         content_hash: str, estimated_tokens: float = 0,
+                         debug: bool = False) -> Tuple[str, str]:
+        """Stream an analysis to disk as it is generated, then validate it.
+        
+        Args:
+            chat_id: ID of the chat to analyze
+            conversation: Transcript produced by _format_conversation
+            output_dir: Directory to save analysis results
+            content_hash: Transcript hash to record on the first line
+            estimated_tokens: Tokens reserved from the rate limiter for the request
+            debug: If True, print the analysis when it fails validation
             
-            # Set a timeout for the API call
-            import httpx
+        Returns:
+            Tuple of (output filepath, status)
+        """
+        filepath = os.path.join(output_dir, f"{chat_id}.md")
+        temp_filepath = filepath + '.tmp'
+        
+        stream = self._create_completion(
+            estimated_tokens,
+            model=self.config.model,
+            messages=self._build_messages(conversation),
+            temperature=self.config.temperature,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        
+        # Write and validate each delta as it arrives instead of buffering the whole response
+        check = StreamingContentCheck()
+        received = False
+        with open(temp_filepath, 'w', encoding='utf-8') as f:
+            # Only guard the writes, so a failed open is reported as itself
             try:
-                with httpx.Client(timeout=60.0) as client:
-                    response = self.openai_client.chat.completions.create(
-                        model=self.config.model,
-                        messages=[
-                            {"role": "system", "content": self.config.system_prompt},
-                            {"role": "user", "content": conversation}
-                        ],
-                        temperature=self.config.temperature
-                    )
-                
-                if is_single_chat:
-                    print("OpenAI API call completed successfully")
-                
-                # Save analysis to markdown file
-                analysis = response.choices[0].message.content
-                
-            except httpx.TimeoutException:
-                print(f"Error: API call timed out after 60 seconds")
-                return filepath, 'api_error'
-            except KeyboardInterrupt:
-                print("\nOperation cancelled by user")
-                return filepath, 'cancelled'
-            except Exception as e:
-                print(f"Error during API call: {str(e)}")
-                return filepath, 'api_error'
+                f.write(f"{ANALYSIS_HASH_PREFIX}{content_hash}{ANALYSIS_HASH_SUFFIX}\n")
+                for chunk in stream:
+                    if not chunk.choices:
+                        # The final chunk carries usage and no choices
+                        self._record_usage(chunk.usage, estimated_tokens)
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        f.write(delta)
+                        check.feed(delta)
+                        received = True
+            except BaseException:
+                f.close()
+                os.remove(temp_filepath)
+                raise
+        
+        if not received:
+            os.remove(temp_filepath)
+            return filepath, 'api_error'
+        
+        return self._finalize_analysis(chat_id, temp_filepath, filepath, check, debug=debug)
+
+    def _finalize_analysis(self, chat_id: str, temp_filepath: str, filepath: str,
+                           check: StreamingContentCheck, debug: bool = False) -> Tuple[str, str]:
+        """Move a streamed analysis into place if it passed validation.
+        
+        Args:
+            chat_id: ID of the analyzed chat
+            temp_filepath: Temporary file holding the analysis
+            filepath: Final markdown path for a valid analysis
+            check: Validation state fed with the streamed analysis
+            debug: If True, print the analysis when it fails validation
             
-            # Only create directory and write file if we have valid analysis
-            if analysis:
-                os.makedirs(output_dir, exist_ok=True)
-                
-                # Write to a temporary file first
-                temp_filepath = filepath + '.tmp'
-                with open(temp_filepath, 'w') as f:
-                    f.write(analysis)
-                
-                # Validate the format
-                from file_validator import FileValidator
-                if FileValidator.verify_md_format(temp_filepath):
-                    # If valid, rename to final filepath
-                    os.rename(temp_filepath, filepath)
-                    return filepath, 'success'
-                else:
-                    # If invalid and in single chat mode, print the analysis content
-                    if is_single_chat:
-                        print("\nAnalysis content that failed format validation:")
-                        print("=" * 80)
-                        print(analysis)
-                        print("=" * 80)
-                        print("\nMissing required sections:")
-                        FileValidator.verify_md_format(temp_filepath, debug=True)
-                    
-                    # Delete temp file and count as format error
-                    os.remove(temp_filepath)
-                    print(f"Format error in chat {chat_id} - generated analysis has invalid format")
-                    return filepath, 'format_error'
+        Returns:
+            Tuple of (output filepath, status)
+        """
+        if check.verify(filepath):
+            # If valid, move into place (replacing an outdated analysis)
+            os.replace(temp_filepath, filepath)
+            return filepath, 'success'
+        
+        # Only single chat mode needs the rejected text, to print it
+        analysis = ''
+        if debug:
+            with open(temp_filepath, 'r', encoding='utf-8') as f:
+                analysis = f.read()
+        
+        # Delete temp file and count as format error
+        os.remove(temp_filepath)
+        return self._reject_analysis(chat_id, analysis, filepath, debug=debug)
+
+    def _reject_analysis(self, chat_id: str, analysis: str, filepath: str,
+                         debug: bool = False) -> Tuple[str, str]:
+        """Report an analysis that failed format validation.
+        
+        Args:
+            chat_id: ID of the analyzed chat
+            analysis: Markdown analysis that failed validation
+            filepath: Final markdown path the analysis would have been saved to
+            debug: If True, print the analysis and its missing sections
             
-            return filepath, 'api_error'
+        Returns:
+            Tuple of (output filepath, 'format_error')
+        """
+        # If invalid and in single chat mode, print the analysis content
+        if debug:
+            print("\nAnalysis content that failed format validation:")
+            print("=" * 80)
+            print(analysis)
+            print("=" * 80)
+            print("\nMissing required sections:")
+            from file_validator import FileValidator
+            FileValidator.verify_md_content(analysis, filepath, debug=True)
+        
+        print(f"Format error in chat {chat_id} - generated analysis has invalid format")
+        return filepath, 'format_error'
+
+    def _pack_chats(self, chats: List[Tuple[str, List[Dict[str, Any]]]]
+                    ) -> Tuple[List[List[Tuple[str, str]]], List[Tuple[str, List[Dict[str, Any]]]]]:
+        """Group small chats so several can share one analysis request.
+        
+        Chats are taken in order and added to the current pack until it holds
+        config.pack_size chats or adding the next transcript would exceed
+        config.pack_max_chars. Chats that end up alone, already have a cached
+        analysis or duplicate a packed chat are returned unpacked.
+        
+        Args:
+            chats: List of (chat_id, messages) pairs to analyze
             
-        except Exception as e:
-            print(f"Error analyzing chat {chat_id}: {str(e)}")
-            # Don't create the file if analysis failed
-            return os.path.join(output_dir, f"{chat_id}.md"), 'api_error'
+        Returns:
+            Tuple of (packs of (chat_id, transcript) pairs, unpacked chats)
+        """
+        packs = []
+        singles = []
+        current = []
+        current_chars = 0
+        
+        packed_cache_paths = set()
+        
+        for chat_id, messages in chats:
+            # Stop formatting as soon as a chat is too long to pack
+            conversation = self._format_conversation(messages, max_chars=self.config.pack_max_chars)
+            if conversation is None:
+                singles.append((chat_id, messages))
+                continue
+            
+            # Chats with a cached analysis are copied by the single-chat path,
+            # and a chat identical to one already packed waits for that pack's
+            # result there instead of being paid for again
+            cache_path = self._cache_path(conversation.encode('utf-8'), self.config.research_folder)
+            if cache_path in packed_cache_paths or self._has_cached_analysis(cache_path):
+                singles.append((chat_id, messages))
+                continue
+            packed_cache_paths.add(cache_path)
+            
+            if (len(current) >= self.config.pack_size or
+                    current_chars + len(conversation) > self.config.pack_max_chars):
+                packs.append(current)
+                current = []
+                current_chars = 0
+            current.append((chat_id, messages, conversation))
+            current_chars += len(conversation)
+        packs.append(current)
+        
+        # A pack of one is just a normal request
+        singles.extend((p[0][0], p[0][1]) for p in packs if len(p) == 1)
+        packs = [[(chat_id, conversation) for chat_id, _, conversation in p]
+                 for p in packs if len(p) > 1]
+        
+        return packs, singles
 
-    def analyze_all_chats_parallel(self) -> None:
-        """Analyze all chat conversations in parallel."""
-        chats = self._load_chat_data()
-        if not chats:
-            print("No chat data found")
-            return
+    def _pack_batch(self, pack: List[Tuple[str, str]]) -> str:
+        """Build the user message for a packed analysis request.
+        
+        Args:
+            pack: List of (chat_id, transcript) pairs
+            
+        Returns:
+            User message containing the instructions and every transcript
+        """
+        parts = [PACK_INSTRUCTIONS.format(count=len(pack))]
+        for chat_id, conversation in pack:
+            parts.append(f"===CHAT {chat_id}===\n{conversation}\n")
+        return ''.join(parts)
 
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            futures = []
-            for chat_id, messages in chats.items():
-                future = executor.submit(
-                    self.analyze_and_save_chat,
-                    chat_id,
-                    messages,
-                    self.config.research_folder
-                )
-                futures.append(future)
+    def _unpack_batch(self, content: str, pack: List[Tuple[str, str]],
+                      output_dir: str) -> List[Tuple[str, str]]:
+        """Split a packed response and save one analysis per chat.
+        
+        Args:
+            content: JSON object returned by the model, keyed by chat ID
+            pack: List of (chat_id, transcript) pairs that were sent
+            output_dir: Directory to save analysis results
+            
+        Returns:
+            List of (output filepath, status) tuples, one per chat
+        """
+        try:
+            analyses = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            analyses = None
+        if not isinstance(analyses, dict):
+            print("Format error in packed request - response is not a JSON object")
+            return [(os.path.join(output_dir, f"{chat_id}.md"), 'format_error')
+                    for chat_id, _ in pack]
+        
+        results = []
+        for chat_id, conversation in pack:
+            analysis = analyses.get(chat_id)
+            if isinstance(analysis, str) and analysis:
+                results.append(self._save_analysis(chat_id, analysis, output_dir,
+                                                   content_hash=self._content_hash(conversation.encode('utf-8'))))
+            else:
+                print(f"Format error in chat {chat_id} - missing from packed response")
+                results.append((os.path.join(output_dir, f"{chat_id}.md"), 'format_error'))
+        return results
 
-            # Process results as they complete
-            completed = 0
-            successful = 0
-            skipped = 0
-            format_errors = 0
-            api_errors = 0
+    def analyze_and_save_pack(self, pack: List[Tuple[str, str]],
+                              output_dir: str) -> List[Tuple[str, str]]:
+        """Analyze several small chats in one request and save each result.
+        
+        Successful analyses are added to the response cache like single-chat
+        results, and identical chats analyzed elsewhere wait for this pack.
+        
+        Args:
+            pack: List of (chat_id, transcript) pairs from _pack_chats
+            output_dir: Directory to save analysis results
             
-            for future in concurrent.futures.as_completed(futures):
+        Returns:
+            List of (output filepath, status) tuples, one per chat
+        """
+        cache_paths = {chat_id: self._cache_path(conversation.encode('utf-8'), output_dir)
+                       for chat_id, conversation in pack}
+        with contextlib.ExitStack() as stack:
+            # Taken in sorted order so two holders of several locks can't deadlock
+            for cache_path in sorted(set(cache_paths.values())):
+                stack.enter_context(self._cache_entry_lock(cache_path))
+            
+            # An identical chat may have been analyzed while this pack waited
+            results = {}
+            for chat_id, _ in pack:
+                if self._has_cached_analysis(cache_paths[chat_id]):
+                    filepath = os.path.join(output_dir, f"{chat_id}.md")
+                    self._atomic_copy(cache_paths[chat_id], filepath)
+                    results[chat_id] = (filepath, 'success')
+            
+            uncached = [(chat_id, conversation) for chat_id, conversation in pack
+                        if chat_id not in results]
+            if uncached:
+                for (chat_id, _), result in zip(uncached, self._request_pack(uncached, output_dir)):
+                    results[chat_id] = self._cache_analysis(result, cache_paths[chat_id])
+        
+        return [results[chat_id] for chat_id, _ in pack]
+
+    def _request_pack(self, pack: List[Tuple[str, str]],
+                      output_dir: str) -> List[Tuple[str, str]]:
+        """Send one packed request and save each chat's analysis.
+        
+        Args:
+            pack: List of (chat_id, transcript) pairs
+            output_dir: Directory to save analysis results
+            
+        Returns:
+            List of (output filepath, status) tuples, one per chat
+        """
+        user_message = self._pack_batch(pack)
+        try:
+            estimated_tokens = self._system_prompt_tokens + self._count_tokens(user_message)
+            response = self._create_completion(
+                estimated_tokens,
+                model=self.config.model,
+                messages=[self.system_message, {"role": "user", "content": user_message}],
+                temperature=self.config.temperature,
+                response_format={"type": "json_object"}
+            )
+            self._record_usage(response.usage, estimated_tokens)
+            content = response.choices[0].message.content
+        except Exception as e:
+            print(f"Error during API call: {str(e)}")
+            content = None
+        
+        if not content:
+            return [(os.path.join(output_dir, f"{chat_id}.md"), 'api_error')
+                    for chat_id, _ in pack]
+        results = self._unpack_batch(content, pack, output_dir)
+        
+        # Give chats the packed response dropped or garbled one request of
+        # their own before counting them as failed
+        for i, ((chat_id, conversation), (_, status)) in enumerate(zip(pack, results)):
+            if status == 'format_error':
+                print(f"Retrying chat {chat_id} on its own")
+                results[i] = self._request_analysis(
+                    chat_id, conversation, output_dir,
+                    self._content_hash(conversation.encode('utf-8')),
+                    self._count_tokens(conversation)
+                )
+        return results
+
+    def analyze_all_chats_parallel(self) -> None:
+        """Analyze all chat conversations in parallel.
+        
+        Chats are streamed from the export and submitted as they are parsed,
+        so only the chats currently in flight are held in memory.
+        """
+        counts = {'success': 0, 'skipped': 0, 'format_error': 0, 'api_error': 0}
+        total = 0
+        completed = 0
+        
+        # Create the output directory once here rather than in every worker
+        os.makedirs(self.config.research_folder, exist_ok=True)
+        
+        # List already-analyzed chats once and skip them instead of submitting them
+        analyzed = self._analyzed_chat_ids(self.config.research_folder)
+        
+        # IDs already taken from the export. A repeated ID is skipped, so two
+        # workers never write the same analysis file at once.
+        seen = set()
+        
+        def pending_chats() -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+            nonlocal total, completed
+            try:
+                for chat_id, messages in self._iter_chat_data():
+                    if chat_id in seen:
+                        logging.debug(f"Skipping repeated conversation ID: {chat_id}")
+                        continue
+                    seen.add(chat_id)
+                    total += 1
+                    if chat_id in analyzed:
+                        # Format with the same cap as analyze_and_save_chat so
+                        # the hash matches the one recorded in the analysis
+                        conversation = self._format_conversation(messages, max_chars=MAX_TRANSCRIPT_CHARS)
+                        if conversation is not None and self._is_analysis_current(
+                                os.path.join(self.config.research_folder, f"{chat_id}.md"),
+                                self._content_hash(conversation.encode('utf-8'))):
+                            counts['skipped'] += 1
+                            completed += 1
+                            continue
+                    yield chat_id, messages
+            except Exception as e:
+                print(f"Error loading conversations: {str(e)}")
+        
+        # Number of chats each submitted job covers
+        job_sizes = {}
+        
+        def record(future: concurrent.futures.Future) -> None:
+            nonlocal completed
+            size = job_sizes.pop(future)
+            error = future.exception()
+            if error is not None:
+                # API errors are already returned as statuses; anything raised
+                # is unexpected, so count its chats as failed and keep going
+                print(f"\nUnexpected error analyzing {size} chat(s): {error}")
+                results = [(None, 'api_error')] * size
+            else:
+                result = future.result()
+                # Packed requests return one result per chat
+                results = result if isinstance(result, list) else [result]
+            for _, status in results:
                 completed += 1
-                _, status = future.result()
-                
-                if status == 'success':
-                    successful += 1
-                elif status == 'skipped':
-                    skipped += 1
-                elif status == 'format_error':
-                    format_errors += 1
-                elif status == 'api_error':
-                    api_errors += 1
-                    
-                print(f"\rProgress: {completed}/{len(futures)} chats processed", end='')
-                
-            print(f"\nCompleted! {successful}/{len(futures)} chats analyzed successfully")
-            print(f"Skipped: {skipped} chats (already exist or too large)")
-            print(f"Failed due to format errors: {format_errors} chats")
-            print(f"Failed due to API errors: {api_errors} chats")
-            print(f"Total failed: {format_errors + api_errors} chats")
+                if status in counts:
+                    counts[status] += 1
+            print(f"\rProgress: {completed}/{total} chats processed", end='')
+        
+        # Queue each chat as its own request, or pack small chats together
+        # (packing has to see every small chat before it can group them)
+        output_dir = self.config.research_folder
+        if self.config.pack_size > 1:
+            packs, singles = self._pack_chats(pending_chats())
+            jobs = [(self.analyze_and_save_chat, (chat_id, messages, output_dir), 1)
+                    for chat_id, messages in singles]
+            jobs += [(self.analyze_and_save_pack, (pack, output_dir), len(pack)) for pack in packs]
+        else:
+            jobs = ((self.analyze_and_save_chat, (chat_id, messages, output_dir), 1)
+                    for chat_id, messages in pending_chats())
+        
+        # Only keep a small multiple of the worker count submitted at once so
+        # pending requests for a very large export are not all held in memory
+        max_pending = 2 * self.config.max_workers
+        
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.config.max_workers) as executor:
+            pending = set()
+            for func, args, size in jobs:
+                if len(pending) >= max_pending:
+                    done, pending = concurrent.futures.wait(
+                        pending, return_when=concurrent.futures.FIRST_COMPLETED
+                    )
+                    for future in done:
+                        record(future)
+                future = executor.submit(func, *args)
+                job_sizes[future] = size
+                pending.add(future)
+            
+            # Process the remaining results as they complete
+            for future in concurrent.futures.as_completed(pending):
+                record(future)
+        
+        if not total:
+            print("No chat data found")
+            return
+        
+        failed = counts['format_error'] + counts['api_error']
+        print(f"\nCompleted! {counts['success']}/{total} chats analyzed successfully")
+        print(f"Skipped: {counts['skipped']} chats (already exist or too large)")
+        print(f"Failed due to format errors: {counts['format_error']} chats")
+        print(f"Failed due to API errors: {counts['api_error']} chats")
+        print(f"Total failed: {failed} chats")
+        if self.prompt_tokens:
+            cached_percent = self.cached_prompt_tokens / self.prompt_tokens * 100
+            print(f"Prompt tokens: {self.prompt_tokens} "
+                  f"({self.cached_prompt_tokens} cached by OpenAI, {cached_percent:.1f}%)")
 
         # Generate PDFs if requested
         if self.config.pdf_chunks:
+            # Imported here because weasyprint is slow to load and only PDF runs need it
+            from pdf_generator import PDFGenerator
             print(f"\nGenerating {self.config.pdf_chunks} PDF files...")
             pdf_gen = PDFGenerator(
                 markdown_dir=self.config.research_folder,
@@ -252,6 +1095,294 @@ class ConversationData:
             )
             pdf_gen.generate_pdfs(self.config.pdf_chunks)
 
+    def analyze_all_chats_batch(self) -> None:
+        """Analyze all chat conversations with OpenAI Batch API jobs.
+        
+        Every chat without an existing analysis is written as one request line
+        of a JSONL file, split into several files where a single one would
+        exceed the Batch API's per-batch limits. Each file is uploaded and
+        submitted as a batch. The batches are polled until they finish and each
+        result is validated and saved the same way as in the real-time path.
+        Batch jobs are billed at a discount but may take up to 24 hours to
+        complete.
+        
+        Chats whose transcript is already in the response cache are not sent,
+        and chats with identical transcripts share a single request.
+        
+        The submitted batches are recorded in the output directory until their
+        results are saved, so a run that is interrupted while waiting picks
+        the same batches up again instead of submitting (and paying for) them twice.
+        """
+        output_dir = self.config.research_folder
+        state_file = os.path.join(output_dir, BATCH_STATE_FILE)
+        state = self._load_batch_state(state_file)
+        if state:
+            print(f"Resuming {len(state['batch_ids'])} batch(es) submitted by a previous run")
+        else:
+            state = self._submit_batch(output_dir, state_file)
+            if not state:
+                return
+        
+        successful = 0
+        format_errors = 0
+        for batch_id in state['batch_ids']:
+            batch = self._wait_for_batch(batch_id)
+            if batch.status != 'completed':
+                print(f"\nBatch {batch_id} finished with status: {batch.status}")
+            
+            # Failed, expired and cancelled batches can still hold results for
+            # some requests, and requests that failed are listed in the error file
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if file_id:
+                    saved, rejected = self._save_batch_results(file_id, state, output_dir)
+                    successful += saved
+                    format_errors += rejected
+        
+        # Every result is saved, so the next run starts new batches
+        os.remove(state_file)
+        
+        total = state['total']
+        api_errors = total - successful - format_errors
+        print(f"\nCompleted! {successful}/{total} chats analyzed successfully")
+        print(f"Skipped: {state['skipped']} chats (already exist or too large)")
+        print(f"Reused cached analyses: {state['reused']} chats")
+        print(f"Failed due to format errors: {format_errors} chats")
+        print(f"Failed due to API errors: {api_errors} chats")
+        print(f"Total failed: {format_errors + api_errors} chats")
+
+    def _save_batch_results(self, file_id: str, state: Dict[str, Any],
+                            output_dir: str) -> Tuple[int, int]:
+        """Save the analyses in a batch output file and report failed requests.
+        
+        Args:
+            file_id: ID of the batch output or error file
+            state: Batch state recorded by _submit_batch
+            output_dir: Directory to save analysis results
+            
+        Returns:
+            Tuple of (chats saved, chats whose analysis failed validation)
+        """
+        successful = 0
+        format_errors = 0
+        # Stream the file line by line rather than holding it all in memory
+        with self.openai_client.files.with_streaming_response.content(file_id) as output:
+            for line in output.iter_lines():
+                if not line.strip():
+                    continue
+                result = orjson.loads(line)
+                chat_id = result['custom_id']
+                copies = state['duplicates'].get(chat_id, [])
+                response = result.get('response') or {}
+                if result.get('error') or response.get('status_code') != 200:
+                    error = result.get('error') or (response.get('body') or {}).get('error') or {}
+                    reason = error.get('message') or f"status {response.get('status_code')}"
+                    print(f"Batch request for chat {', '.join([chat_id] + copies)} failed: {reason}")
+                    continue
+                
+                analysis = response['body']['choices'][0]['message']['content']
+                if not analysis:
+                    continue
+                
+                # Save each result as it would have been saved by the real-time path
+                filepath, status = self._cache_analysis(
+                    self._save_analysis(chat_id, analysis, output_dir,
+                                        content_hash=state['content_hashes'][chat_id]),
+                    state['cache_paths'][chat_id]
+                )
+                if status == 'success':
+                    for duplicate_id in copies:
+                        self._atomic_copy(filepath, os.path.join(output_dir, f"{duplicate_id}.md"))
+                    successful += 1 + len(copies)
+                else:
+                    format_errors += 1 + len(copies)
+        return successful, format_errors
+
+    def _submit_batch(self, output_dir: str, state_file: str) -> Optional[Dict[str, Any]]:
+        """Submit every chat that still needs analysis as Batch API jobs.
+        
+        Args:
+            output_dir: Directory analysis results are saved to
+            state_file: Path to record the submitted batches at
+            
+        Returns:
+            The recorded batch state, or None if there was nothing to submit
+        """
+        chats = self._load_chat_data()
+        if not chats:
+            print("No chat data found")
+            return None
+        
+        os.makedirs(output_dir, exist_ok=True)
+        
+        pending = 0
+        skipped = 0
+        reused = 0
+        analyzed = self._analyzed_chat_ids(output_dir)
+        # Cache path of each submitted chat, and the request already carrying
+        # each cache path so identical transcripts are only sent once
+        cache_paths = {}
+        content_hashes = {}
+        request_by_cache_path = {}
+        duplicates = {}
+        # Request files with the number of requests in each
+        requests_files = []
+        file_requests = []
+        file_bytes = 0
+        out = None
+        try:
+            # Write one request per chat that still needs analysis, starting a
+            # new file whenever the next request would break a per-batch limit
+            for chat_id, messages in chats.items():
+                conversation = self._format_conversation(messages, max_chars=MAX_TRANSCRIPT_CHARS)
+                if conversation is None:
+                    print(f"Skipping chat {chat_id} - conversation exceeds {MAX_CONVERSATION_TOKENS} token limit")
+                    skipped += 1
+                    continue
+                encoded = conversation.encode('utf-8')
+                content_hash = self._content_hash(encoded)
+                if chat_id in analyzed and self._is_analysis_current(
+                        os.path.join(output_dir, f"{chat_id}.md"), content_hash):
+                    skipped += 1
+                    continue
+                
+                estimated_tokens = self._count_tokens(conversation)
+                if estimated_tokens > MAX_CONVERSATION_TOKENS:
+                    print(f"Skipping chat {chat_id} - estimated {estimated_tokens} tokens exceeds limit")
+                    skipped += 1
+                    continue
+                
+                cache_path = self._cache_path(encoded, output_dir)
+                if self._has_cached_analysis(cache_path):
+                    self._atomic_copy(cache_path, os.path.join(output_dir, f"{chat_id}.md"))
+                    reused += 1
+                    continue
+                if cache_path in request_by_cache_path:
+                    duplicates[request_by_cache_path[cache_path]].append(chat_id)
+                    continue
+                request_by_cache_path[cache_path] = chat_id
+                cache_paths[chat_id] = cache_path
+                content_hashes[chat_id] = content_hash
+                duplicates[chat_id] = []
+                
+                request = {
+                    "custom_id": chat_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {
+                        "model": self.config.model,
+                        "messages": self._build_messages(conversation),
+                        "temperature": self.config.temperature
+                    }
+                }
+                line = orjson.dumps(request) + b'\n'
+                if (out is None or file_requests[-1] == BATCH_MAX_REQUESTS or
+                        file_bytes + len(line) > BATCH_MAX_FILE_BYTES):
+                    if out is not None:
+                        out.close()
+                    requests_file = os.path.join(
+                        output_dir, f'batch_requests_{len(requests_files) + 1}.jsonl')
+                    out = open(requests_file, 'wb')
+                    requests_files.append(requests_file)
+                    file_requests.append(0)
+                    file_bytes = 0
+                out.write(line)
+                file_requests[-1] += 1
+                file_bytes += len(line)
+                pending += 1
+            
+            if out is not None:
+                out.close()
+            
+            if not pending:
+                print(f"Nothing to submit - skipped {skipped} chats (already exist or too large), "
+                      f"reused {reused} cached analyses")
+                return None
+            
+            # Record everything needed to save the results before waiting on them
+            state = {
+                'batch_ids': [],
+                'cache_paths': cache_paths,
+                'content_hashes': content_hashes,
+                'duplicates': duplicates,
+                # Chats covered by the batches, including duplicates sharing a request
+                'total': pending + sum(len(ids) for ids in duplicates.values()),
+                'skipped': skipped,
+                'reused': reused
+            }
+            
+            # Upload each request file and start its batch job. Each batch is
+            # recorded as soon as it exists, so if a later upload fails the
+            # next run still collects the batches already started.
+            for requests_file, count in zip(requests_files, file_requests):
+                with open(requests_file, 'rb') as f:
+                    batch_file = self.openai_client.files.create(file=f, purpose='batch')
+                batch = self.openai_client.batches.create(
+                    input_file_id=batch_file.id,
+                    endpoint='/v1/chat/completions',
+                    completion_window='24h'
+                )
+                state['batch_ids'].append(batch.id)
+                self._save_batch_state(state_file, state)
+                print(f"Submitted batch {batch.id} with {count} requests")
+        finally:
+            if out is not None:
+                out.close()
+            for requests_file in requests_files:
+                os.remove(requests_file)
+        
+        print(f"Submitted {pending} requests covering {state['total']} chats")
+        return state
+
+    def _save_batch_state(self, state_file: str, state: Dict[str, Any]) -> None:
+        """Record the submitted batches, replacing any earlier record atomically.
+        
+        Args:
+            state_file: Path to record the batch state at
+            state: Batch state to record
+        """
+        temp_state_file = state_file + '.tmp'
+        self._write_bytes(temp_state_file, orjson.dumps(state))
+        os.replace(temp_state_file, state_file)
+
+    def _load_batch_state(self, state_file: str) -> Optional[Dict[str, Any]]:
+        """Load the batch recorded by an earlier run that didn't finish.
+        
+        Args:
+            state_file: Path the batch state is recorded at
+            
+        Returns:
+            The recorded batch state, or None if there is none
+        """
+        try:
+            with open(state_file, 'rb') as f:
+                return orjson.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, orjson.JSONDecodeError) as e:
+            print(f"Ignoring unreadable batch state {state_file}: {str(e)}")
+            return None
+
+    def _wait_for_batch(self, batch_id: str) -> Any:
+        """Poll a batch job with exponential backoff until it finishes.
+        
+        Args:
+            batch_id: ID of the batch job to poll
+            
+        Returns:
+            The final batch object
+        """
+        delay = BATCH_POLL_INITIAL_SECONDS
+        while True:
+            batch = self.openai_client.batches.retrieve(batch_id)
+            if batch.status in BATCH_TERMINAL_STATUSES:
+                return batch
+            
+            counts = batch.request_counts
+            if counts:
+                print(f"\rBatch {batch.status}: {counts.completed}/{counts.total} requests done", end='')
+            time.sleep(delay)
+            delay = min(delay * 2, BATCH_POLL_MAX_SECONDS)
+
     def export_chat_history(self, chat_id: str, format: str = 'json') -> str:
         """Export a chat conversation to a file.
         
@@ -271,17 +1402,11 @@ class ConversationData:
         if not os.path.exists(conversations_file):
             raise ValueError(f"No conversations.json found in {self.config.convo_folder}")
             
-        with open(conversations_file, 'r') as f:
-            conversations = json.load(f)
-            
-        print(f"Found {len(conversations)} conversations")
-        # Find the target conversation
+        # Find the target conversation, stopping as soon as it has been parsed
         target_conv = None
-        for conv in conversations:
+        for conv in self._iter_conversations():
             if isinstance(conv, dict):
-                conv_id = conv.get('id')
-                print(f"Checking conversation {conv_id}")
-                if conv_id == chat_id:
+                if conv.get('id') == chat_id:
                     target_conv = conv
                     print(f"Found target conversation with ID {chat_id}")
                     break
@@ -292,11 +1417,11 @@ class ConversationData:
         # Export in requested format
         if format == 'json':
             output_file = os.path.join(exports_dir, f"{chat_id}.json")
-            with open(output_file, 'w') as f:
-                json.dump(target_conv, f, indent=2)
+            self._write_bytes(output_file, orjson.dumps(target_conv, option=orjson.OPT_INDENT_2))
         else:
             output_file = os.path.join(exports_dir, f"{chat_id}.txt")
-            with open(output_file, 'w') as f:
+            # Build the whole export in memory and write it out in one go
+            with io.StringIO() as f:
                 mapping = target_conv.get('mapping', {})
                 print(f"Found {len(mapping)} messages in mapping")
                 print(f"Exporting to chat_exports directory...")
@@ -306,36 +1431,31 @@ class ConversationData:
                 f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
                 f.write("-" * 80 + "\n\n")
                 
-                # Function to traverse message tree
-                def traverse_messages(node_id, visited=None):
-                    if visited is None:
-                        visited = set()
-                    
-                    if node_id in visited:
-                        return []
-                    visited.add(node_id)
-                    
-                    node_data = mapping.get(node_id)
-                    if not node_data:
-                        return []
-                    
-                    # Get message data
-                    message = node_data.get('message')
+                # Function to traverse message tree depth-first, each message
+                # before its children. Uses an explicit stack because a long
+                # chat is a chain as deep as its message count, which would
+                # exceed the recursion limit.
+                def traverse_messages(root_id):
                     result = []
-                    
-                    # Add parent's message first
-                    parent_id = node_data.get('parent')
-                    if parent_id:
-                        result.extend(traverse_messages(parent_id, visited))
-                    
-                    # Add current message
-                    if message:
-                        result.append(message)
-                    
-                    # Add children's messages
-                    children = node_data.get('children', [])
-                    for child_id in children:
-                        result.extend(traverse_messages(child_id, visited))
+                    visited = set()
+                    stack = [root_id]
+                    while stack:
+                        node_id = stack.pop()
+                        if node_id in visited:
+                            continue
+                        visited.add(node_id)
+                        
+                        node_data = mapping.get(node_id)
+                        if not node_data:
+                            continue
+                        
+                        # Add current message
+                        message = node_data.get('message')
+                        if message:
+                            result.append(message)
+                        
+                        # Queue children so the first child is visited next
+                        stack.extend(reversed(node_data.get('children', [])))
                     
                     return result
                 
@@ -453,131 +1573,196 @@ class ConversationData:
                                             f.write(f"      Duration: {media['metadata'].get('end', 0)} seconds\n")
                                 
                                 f.write("-" * 80 + "\n")
+                
+                self._write_bytes(output_file, f.getvalue().encode('utf-8'))
                     
         return output_file
 
+    def _analyzed_chat_ids(self, output_dir: str) -> Set[str]:
+        """List the chats that already have an analysis file.
+        
+        One directory listing replaces a stat call per chat when resuming a
+        run where most chats are already done.
+        
+        Args:
+            output_dir: Directory containing the analysis markdown files
+            
+        Returns:
+            Set of chat IDs with an existing .md file
+        """
+        if not os.path.isdir(output_dir):
+            return set()
+        return {name[:-3] for name in os.listdir(output_dir) if name.endswith('.md')}
+
+    def _iter_conversations(self) -> Iterator[Dict[str, Any]]:
+        """Stream conversations from conversations.json one at a time.
+        
+        Exports over STREAM_PARSE_MIN_BYTES are parsed incrementally so only
+        the conversation being processed is held in memory. Smaller exports
+        are parsed in one go with orjson, which is much faster.
+        
+        Yields:
+            Conversation dictionaries in file order, or nothing if the export
+            is not a list of conversations
+        """
+        conversations_file = os.path.join(self.config.convo_folder, 'conversations.json')
+        with open(conversations_file, 'rb') as f:
+            if os.fstat(f.fileno()).st_size > STREAM_PARSE_MIN_BYTES:
+                # ijson would silently find no items in anything but an array,
+                # so check the first token before streaming
+                first = f.read(1)
+                while first.isspace():
+                    first = f.read(1)
+                f.seek(0)
+                if first != b'[':
+                    print(f"Error: Expected a list of conversations in {conversations_file}")
+                    return
+                yield from ijson.items(f, 'item', use_float=True)
+            else:
+                conversations = orjson.loads(f.read())
+                if not isinstance(conversations, list):
+                    print(f"Error: Expected a list of conversations in {conversations_file}")
+                    return
+                yield from conversations
+
     def _load_chat_data(self) -> Dict[str, List[Dict[str, Any]]]:
         """Load chat data from conversations.json.
         
         Returns:
             Dictionary mapping chat IDs to lists of messages
         """
-        chats = {}
+        try:
+            return dict(self._iter_chat_data())
+        except Exception as e:
+            print(f"Error loading conversations: {str(e)}")
+            return {}
+
+    def _iter_chat_data(self, only_chat_id: Optional[str] = None
+                        ) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+        """Stream chats from conversations.json as (chat_id, messages) pairs.
+        
+        Each conversation is parsed, filtered and flattened on its own, so a
+        caller that makes a single pass never holds every chat in memory.
+        
+        Args:
+            only_chat_id: If set, skip every other conversation without
+                flattening it, print detailed loading info for this one
+                (single chat mode) and stop once it has been yielded
+            
+        Yields:
+            Tuple of (chat_id, messages) for each conversation to analyze
+        """
         conversations_file = os.path.join(self.config.convo_folder, 'conversations.json')
         if not os.path.exists(conversations_file):
             print(f"No conversations.json found in {self.config.convo_folder}")
-            return {}
+            return
             
-        try:
-            print(f"Loading conversations from {conversations_file}")
-            with open(conversations_file, 'r') as f:
-                conversations = json.load(f)
+        # Convert the start date to a timestamp once, so conversations are
+        # filtered by comparing their raw create_time values
+        start_timestamp = None
+        if self.config.start_date:
+            start_of_day = datetime.combine(self.config.start_date, datetime.min.time())
+            start_timestamp = start_of_day.replace(tzinfo=self.local_tz).timestamp()
+        
+        is_single_chat = only_chat_id is not None
+        print(f"Loading conversations from {conversations_file}")
+        
+        # Process each conversation as it is parsed. Malformed records are
+        # only logged at debug level and reported once as a count.
+        invalid = 0
+        loaded = 0
+        for conv in self._iter_conversations():
+            if not isinstance(conv, dict):
+                logging.debug(f"Skipping non-dict conversation: {type(conv)}")
+                invalid += 1
+                continue
                 
-            if not isinstance(conversations, list):
-                print(f"Error: Expected a list of conversations in {conversations_file}")
-                return {}
+            # Get required fields
+            chat_id = conv.get('id')
+            create_time = conv.get('create_time')
+            if not chat_id or not create_time:
+                logging.debug(f"Skipping conversation missing id or create_time: {chat_id}")
+                invalid += 1
+                continue
                 
-            # Process each conversation
-            for conv in conversations:
-                if not isinstance(conv, dict):
-                    print(f"Skipping non-dict conversation: {type(conv)}")
-                    continue
+            # In single chat mode, only the target chat is processed
+            if is_single_chat and chat_id != only_chat_id:
+                continue
+            
+            # Debug: Print more info if this is the chat we're looking for
+            if is_single_chat:
+                print(f"\nFound target chat {chat_id}:")
+                print(f"  create_time: {create_time}")
+                print(f"  messages: {len(conv.get('messages', []))}")
+                print(f"  mapping: {len(conv.get('mapping', {}))}")
+                print(f"  Full conversation data: {json.dumps(conv, indent=2)}\n")
+                
+            # Filter by start date if specified
+            if start_timestamp is not None and create_time < start_timestamp:
+                continue
                     
-                # Get required fields
-                chat_id = conv.get('id')
-                create_time = conv.get('create_time')
-                if not chat_id or not create_time:
-                    print(f"Skipping conversation missing id or create_time: {chat_id}")
+            # Extract messages from mapping
+            messages = []
+            mapping = conv.get('mapping', {})
+            current_node = conv.get('current_node')
+            
+            # Debug: Print message counts if in single chat mode
+            if is_single_chat:
+                print(f"Processing messages from mapping:")
+                print(f"Total messages in mapping: {len(mapping)}")
+                print(f"Current node: {current_node}")
+            
+            # Walk parent links from the current node up to the root, then
+            # reverse once so the branch reads in chronological order. The
+            # bound methods are looked up once rather than on every step.
+            branch = []
+            visited = set()
+            get_node, mark_visited, add_to_branch = mapping.get, visited.add, branch.append
+            node_id = current_node
+            while node_id and node_id not in visited:
+                mark_visited(node_id)
+                node_data = get_node(node_id)
+                if not node_data:
+                    break
+                add_to_branch((node_id, node_data.get('message')))
+                node_id = node_data.get('parent')
+            branch.reverse()
+            
+            for node_id, message in branch:
+                if not message:
                     continue
-                    
-                # Debug: Print more info if this is the chat we're looking for
-                caller_frame = inspect.currentframe().f_back
-                is_single_chat = caller_frame and caller_frame.f_code.co_name == 'analyze_single_chat'
-                if is_single_chat and chat_id == caller_frame.f_locals.get('chat_id'):
-                    print(f"\nFound target chat {chat_id}:")
-                    print(f"  create_time: {create_time}")
-                    print(f"  messages: {len(conv.get('messages', []))}")
-                    print(f"  mapping: {len(conv.get('mapping', {}))}")
-                    print(f"  Full conversation data: {json.dumps(conv, indent=2)}\n")
-                    
-                # Filter by start date if specified
-                if self.config.start_date:
-                    create_date = datetime.fromtimestamp(create_time)
-                    if create_date < self.config.start_date:
-                        continue
-                        
-                # Extract messages from mapping
-                messages = []
-                mapping = conv.get('mapping', {})
-                current_node = conv.get('current_node')
-                
-                # Debug: Print message counts if in single chat mode
-                if is_single_chat:
-                    print(f"Processing messages from mapping:")
-                    print(f"Total messages in mapping: {len(mapping)}")
-                    print(f"Current node: {current_node}")
+                author = message.get('author', {})
+                content = message.get('content', {})
+                metadata = message.get('metadata', {})
                 
-                # Function to traverse message tree
-                def traverse_messages(node_id, visited=None):
-                    if visited is None:
-                        visited = set()
-                    
-                    if node_id in visited:
-                        return []
-                    visited.add(node_id)
-                    
-                    node_data = mapping.get(node_id)
-                    if not node_data:
-                        return []
-                    
-                    # Get message data
-                    message = node_data.get('message')
-                    result = []
+                # Skip system messages and hidden messages
+                if (author.get('role') != 'system' and 
+                    not metadata.get('is_visually_hidden_from_conversation', False)):
                     
-                    # Add parent's message first
-                    parent_id = node_data.get('parent')
-                    if parent_id:
-                        result.extend(traverse_messages(parent_id, visited))
-                    
-                    # Add current message if valid
-                    if message:
-                        author = message.get('author', {})
-                        content = message.get('content', {})
-                        metadata = message.get('metadata', {})
-                        
-                        # Skip system messages and hidden messages
-                        if (author.get('role') != 'system' and 
-                            not metadata.get('is_visually_hidden_from_conversation', False)):
-                            
-                            parts = content.get('parts', [])
-                            if parts and parts[0]:
-                                if is_single_chat:
-                                    print(f"\nIncluding message {node_id}:")
-                                    print(f"  role: {author.get('role')}")
-                                    print(f"  content: {parts[0][:100]}..." if len(parts[0]) > 100 else f"  content: {parts[0]}")
-                                result.append({
-                                    'author': author,
-                                    'content': content,
-                                    'create_time': message.get('create_time', create_time)
-                                })
-                            elif is_single_chat:
-                                print(f"Skipping message {node_id} - empty content")
-                        elif is_single_chat:
-                            print(f"Skipping message {node_id} - system or hidden message")
-                    
-                    return result
-                
-                # Start traversal from current node
-                if current_node:
-                    messages = traverse_messages(current_node)
-                    if is_single_chat:
-                        print(f"\nFound {len(messages)} messages in conversation")
-                
-                chats[chat_id] = messages
-                
-            print(f"\nLoaded {len(chats)} valid conversations")
-            return chats
+                    parts = content.get('parts', [])
+                    if parts and parts[0]:
+                        if is_single_chat:
+                            print(f"\nIncluding message {node_id}:")
+                            print(f"  role: {author.get('role')}")
+                            print(f"  content: {parts[0][:100]}..." if len(parts[0]) > 100 else f"  content: {parts[0]}")
+                        messages.append({
+                            'author': author,
+                            'content': content,
+                            'create_time': message.get('create_time', create_time)
+                        })
+                    elif is_single_chat:
+                        print(f"Skipping message {node_id} - empty content")
+                elif is_single_chat:
+                    print(f"Skipping message {node_id} - system or hidden message")
             
-        except Exception as e:
-            print(f"Error loading conversations: {str(e)}")
-            return {}
+            if current_node and is_single_chat:
+                print(f"\nFound {len(messages)} messages in conversation")
+            
+            loaded += 1
+            yield chat_id, messages
+            if is_single_chat:
+                return
+            
+        if invalid:
+            print(f"Skipped {invalid} malformed conversations (missing id or create_time)")
+        print(f"\nLoaded {loaded} valid conversations")
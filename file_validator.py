@@ -2,11 +2,35 @@
 
 import os
 import logging
-from typing import List, Tuple
+from typing import List, Set, Tuple
 
 class FileValidator:
     """Handles validation and cleaning of markdown files."""
     
+    # Headings every analysis must contain
+    REQUIRED_SECTIONS = (
+        '# 1. Brief Summary',
+        '# 2. Five-Step Decision Loop Analysis',
+        '## Step 1: Problem Framing & Initial Prompting',
+        '## Step 2: Response Evaluation & Validation',
+        '## Step 3: Expertise Application',
+        '## Step 4: Critical Assessment',
+        '### 4.1 Loop Completion Analysis',
+        '### 4.2 Breakdown Analysis',
+        '## Step 5: Process Improvement',
+        '# 3. Collaborative Pattern Analysis',
+        '## Observed Patterns',
+        '## Novel Patterns',
+        '# 4. Recommendations'
+    )
+    
+    # Phrases that indicate an incomplete, generic analysis
+    GENERIC_CONTENT_INDICATORS = (
+        "The USER engaged with the AI",
+        "objectives and approach are not provided",
+        "lack of conversation content"
+    )
+    
     @staticmethod
     def verify_md_format(file_path: str, debug: bool = False) -> bool:
         """Verify if a markdown file has the correct format.
@@ -18,58 +42,69 @@ class FileValidator:
         Returns:
             bool: True if format is valid, False otherwise
         """
-        required_sections = [
-            '# 1. Brief Summary',
-            '# 2. Five-Step Decision Loop Analysis',
-            '## Step 1: Problem Framing & Initial Prompting',
-            '## Step 2: Response Evaluation & Validation',
-            '## Step 3: Expertise Application',
-            '## Step 4: Critical Assessment',
-            '### 4.1 Loop Completion Analysis',
-            '### 4.2 Breakdown Analysis',
-            '## Step 5: Process Improvement',
-            '# 3. Collaborative Pattern Analysis',
-            '## Observed Patterns',
-            '## Novel Patterns',
-            '# 4. Recommendations'
-        ]
-        
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
+        except Exception as e:
+            logging.error(f"Error reading file {file_path}: {str(e)}")
+            return False
+        
+        return FileValidator.verify_md_content(content, file_path, debug=debug)
+
+    @staticmethod
+    def verify_md_content(content: str, file_path: str, debug: bool = False) -> bool:
+        """Verify if markdown content has the correct format.
+        
+        Lets freshly generated analyses be checked before they are written,
+        instead of writing them out and reading them back.
+        
+        Args:
+            content: Markdown text to check
+            file_path: Path the content belongs to, used in log messages
+            debug: If True, print detailed validation info
             
-            # Check for generic content that indicates an incomplete analysis
-            generic_content_indicators = [
-                "The USER engaged with the AI",
-                "objectives and approach are not provided",
-                "lack of conversation content"
-            ]
-            
-            for indicator in generic_content_indicators:
-                if indicator in content:
-                    if debug:
-                        print(f"Found generic content indicator: '{indicator}'")
-                    logging.warning(f"File {file_path} contains generic placeholder content")
-                    return False
-                
-            # Check if all required sections are present
-            missing_sections = []
-            for section in required_sections:
-                if section not in content:
-                    missing_sections.append(section)
+        Returns:
+            bool: True if format is valid, False otherwise
+        """
+        markers = FileValidator.REQUIRED_SECTIONS + FileValidator.GENERIC_CONTENT_INDICATORS
+        found = {marker for marker in markers if marker in content}
+        return FileValidator.verify_found_markers(found, file_path, debug=debug)
+
+    @staticmethod
+    def verify_found_markers(found: Set[str], file_path: str, debug: bool = False) -> bool:
+        """Verify markdown format from the validation markers it contains.
+        
+        Args:
+            found: Required sections and generic content indicators present in the content
+            file_path: Path the content belongs to, used in log messages
+            debug: If True, print detailed validation info
             
-            if missing_sections:
+        Returns:
+            bool: True if format is valid, False otherwise
+        """
+        # Check for generic content that indicates an incomplete analysis
+        for indicator in FileValidator.GENERIC_CONTENT_INDICATORS:
+            if indicator in found:
                 if debug:
-                    print("Missing sections:")
-                    for section in missing_sections:
-                        print(f"  - {section}")
-                logging.warning(f"File {file_path} is missing required sections: {', '.join(missing_sections)}")
+                    print(f"Found generic content indicator: '{indicator}'")
+                logging.warning(f"File {file_path} contains generic placeholder content")
                 return False
-                
-            return True
-        except Exception as e:
-            logging.error(f"Error reading file {file_path}: {str(e)}")
+            
+        # Check if all required sections are present
+        missing_sections = []
+        for section in FileValidator.REQUIRED_SECTIONS:
+            if section not in found:
+                missing_sections.append(section)
+        
+        if missing_sections:
+            if debug:
+                print("Missing sections:")
+                for section in missing_sections:
+                    print(f"  - {section}")
+            logging.warning(f"File {file_path} is missing required sections: {', '.join(missing_sections)}")
             return False
+            
+        return True
 
     @staticmethod
     def verify_and_clean_md_files(directory: str) -> Tuple[List[str], int]:
@@ -87,15 +122,55 @@ class FileValidator:
             logging.error(f"Directory {directory} does not exist")
             return [], 0
         
-        for filename in os.listdir(directory):
-            if filename.endswith('.md'):
-                file_path = os.path.join(directory, filename)
-                if not FileValidator.verify_md_format(file_path):
-                    invalid_files.append(filename)
-                    try:
-                        os.remove(file_path)
-                        logging.info(f"Removed invalid file: {filename}")
-                    except Exception as e:
-                        logging.error(f"Error removing file {filename}: {str(e)}")
+        # Collect the entries first since invalid files are removed below
+        with os.scandir(directory) as entries:
+            md_entries = [entry for entry in entries if entry.name.endswith('.md')]
+        
+        for entry in md_entries:
+            if not FileValidator.verify_md_format(entry.path):
+                invalid_files.append(entry.name)
+                try:
+                    os.remove(entry.path)
+                    logging.info(f"Removed invalid file: {entry.name}")
+                except Exception as e:
+                    logging.error(f"Error removing file {entry.name}: {str(e)}")
         
         return invalid_files, len(invalid_files)
+
+
+class StreamingContentCheck:
+    """Finds validation markers in markdown that arrives in pieces.
+    
+    Only the last few characters of what has been fed are kept, enough to
+    match a marker split across two pieces.
+    """
+    
+    def __init__(self):
+        self.markers = FileValidator.REQUIRED_SECTIONS + FileValidator.GENERIC_CONTENT_INDICATORS
+        self.found: Set[str] = set()
+        self._overlap = max(len(marker) for marker in self.markers) - 1
+        self._tail = ''
+    
+    def feed(self, text: str) -> None:
+        """Scan the next piece of content.
+        
+        Args:
+            text: Content following everything fed so far
+        """
+        window = self._tail + text
+        for marker in self.markers:
+            if marker not in self.found and marker in window:
+                self.found.add(marker)
+        self._tail = window[-self._overlap:]
+    
+    def verify(self, file_path: str, debug: bool = False) -> bool:
+        """Verify the format of everything fed so far.
+        
+        Args:
+            file_path: Path the content belongs to, used in log messages
+            debug: If True, print detailed validation info
+            
+        Returns:
+            bool: True if format is valid, False otherwise
+        """
+        return FileValidator.verify_found_markers(self.found, file_path, debug=debug)
@@ -0,0 +1,32 @@
+"""Shared HTTP client setup for OpenAI requests."""
+
+import httpx
+
+# Long non-streamed completions can take minutes, so only connecting is kept short
+REQUEST_TIMEOUT_SECONDS = 600.0
+CONNECT_TIMEOUT_SECONDS = 10.0
+
+def create_http_client(max_workers: int) -> httpx.Client:
+    """Create a pooled HTTP client for worker threads sharing one OpenAI client.
+
+    Connections (and their TLS handshakes) are reused across requests, and
+    HTTP/2 lets concurrent requests share a connection. Nothing is retried
+    at this level; callers own the retry policy.
+
+    Args:
+        max_workers: Number of worker threads that will send requests
+
+    Returns:
+        HTTP client to pass to OpenAI(http_client=...)
+    """
+    transport = httpx.HTTPTransport(
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=max_workers * 2,
+            max_keepalive_connections=max_workers * 2
+        )
+    )
+    return httpx.Client(
+        transport=transport,
+        timeout=httpx.Timeout(REQUEST_TIMEOUT_SECONDS, connect=CONNECT_TIMEOUT_SECONDS)
+    )
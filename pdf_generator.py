@@ -1,5 +1,6 @@
 """PDF generation and merging functionality."""
 
+import os
 from pathlib import Path
 from typing import List, Tuple
 
@@ -8,6 +9,10 @@ from tqdm import tqdm
 from weasyprint import HTML, CSS
 from weasyprint.text.fonts import FontConfiguration
 
+# Write buffer for merged markdown chunks, which can be several MB each
+WRITE_BUFFER_BYTES = 256 * 1024
+CHUNK_SEPARATOR = '\n\n---\n\n'
+
 class PDFGenerator:
     """Handles conversion of markdown files to PDFs and merging of PDFs."""
     
@@ -194,10 +199,7 @@ class PDFGenerator:
                         if content:
                             # If this file would exceed size limit, save current chunk and start new one
                             if current_size + file_size > md_size_limit and current_chunk:
-                                merged_file = self.output_dir / f"merged_part_{chunk_index}.md"
-                                with open(merged_file, 'w', encoding='utf-8') as f:
-                                    f.write('\n\n---\n\n'.join(current_chunk))
-                                merged_files.append(merged_file)
+                                merged_files.append(self._write_merged_chunk(current_chunk, chunk_index))
                                 current_chunk = []
                                 current_size = 0
                                 chunk_index += 1
@@ -217,17 +219,33 @@ class PDFGenerator:
             
             # Save final chunk if it has content
             if current_chunk:
-                merged_file = self.output_dir / f"merged_part_{chunk_index}.md"
-                with open(merged_file, 'w', encoding='utf-8') as f:
-                    f.write('\n\n---\n\n'.join(current_chunk))
-                merged_files.append(merged_file)
+                merged_files.append(self._write_merged_chunk(current_chunk, chunk_index))
         
         if len(merged_files) > target_chunks:
             print(f"\nNote: Created {len(merged_files)} files to stay under size limit of {self.size_limit_mb}MB per file (original target was {target_chunks} files)")
         
         return merged_files
+    
+    def _write_merged_chunk(self, chunk: List[str], chunk_index: int) -> Path:
+        """Write one chunk of merged markdown to disk.
         
-        return merged_files
+        The parts are written one by one through a large buffer rather than
+        joined into a single string first.
+        
+        Args:
+            chunk: Markdown sections to merge
+            chunk_index: Index used in the merged file name
+            
+        Returns:
+            Path: Path to the merged markdown file
+        """
+        merged_file = self.output_dir / f"merged_part_{chunk_index}.md"
+        with open(merged_file, 'w', encoding='utf-8', buffering=WRITE_BUFFER_BYTES) as f:
+            for i, part in enumerate(chunk):
+                if i:
+                    f.write(CHUNK_SEPARATOR)
+                f.write(part)
+        return merged_file
     
     def convert_all_markdown(self) -> List[Path]:
         """Convert all markdown files in the input directory to PDFs.
@@ -236,8 +254,13 @@ class PDFGenerator:
             List[Path]: List of paths to successfully converted PDFs
         """
         # Get all markdown files and filter out any that don't look like analysis files
-        markdown_files = [f for f in sorted(self.markdown_dir.glob('*.md')) 
-                         if f.stem and len(f.stem) > 8 and '-' in f.stem]  # Analysis files have UUIDs
+        # (filtered on the bare names so only matching files become Path objects)
+        with os.scandir(self.markdown_dir) as entries:
+            markdown_files = sorted(
+                Path(entry.path) for entry in entries
+                if entry.name.endswith('.md') and len(entry.name) > 11  # Analysis files have UUIDs
+                and '-' in entry.name[:-3] and entry.is_file()
+            )
         if not markdown_files:
             print("No markdown files found to convert to PDF")
             return []
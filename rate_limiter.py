@@ -0,0 +1,82 @@
+"""Client-side rate limiting for OpenAI requests."""
+
+import threading
+import time
+
+class RateLimiter:
+    """Thread-safe limiter for requests and tokens per minute.
+
+    Keeps one bucket of request capacity and one of token capacity. Both
+    start full and refill continuously at their per-minute rate, so worker
+    threads sharing a limiter stay under the account's RPM/TPM limits
+    instead of bursting into rate-limit errors.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        """Initialize the rate limiter.
+
+        Args:
+            requests_per_minute: Maximum number of requests per minute
+            tokens_per_minute: Maximum number of tokens per minute
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._available_requests = float(requests_per_minute)
+        self._available_tokens = float(tokens_per_minute)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        """Add the capacity earned since the last refill."""
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._available_requests = min(
+            self.requests_per_minute,
+            self._available_requests + elapsed * self.requests_per_minute / 60
+        )
+        self._available_tokens = min(
+            self.tokens_per_minute,
+            self._available_tokens + elapsed * self.tokens_per_minute / 60
+        )
+
+    def acquire(self, tokens: float = 0) -> None:
+        """Block until one request using the given number of tokens may be sent.
+
+        Args:
+            tokens: Estimated number of tokens the request will consume
+        """
+        # A request larger than the whole bucket waits for a full bucket
+        tokens = min(tokens, self.tokens_per_minute)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._available_requests >= 1 and self._available_tokens >= tokens:
+                    self._available_requests -= 1
+                    self._available_tokens -= tokens
+                    return
+                wait = max(
+                    (1 - self._available_requests) * 60 / self.requests_per_minute,
+                    (tokens - self._available_tokens) * 60 / self.tokens_per_minute
+                )
+            time.sleep(wait)
+
+    def reconcile(self, estimated_tokens: float, actual_tokens: float) -> None:
+        """Correct the token bucket once a request's real usage is known.
+
+        acquire() can only charge an estimate of the prompt, so the
+        difference from the reported usage (which includes completion
+        tokens) is charged or refunded here. The bucket may go negative,
+        making later requests wait until it refills.
+
+        Args:
+            estimated_tokens: Tokens passed to acquire() for the request
+            actual_tokens: Total tokens the API reported for the request
+        """
+        charged = min(estimated_tokens, self.tokens_per_minute)
+        with self._lock:
+            self._refill()
+            self._available_tokens = min(
+                self.tokens_per_minute,
+                self._available_tokens + charged - actual_tokens
+            )
@@ -0,0 +1,16 @@
+"""Shared test fixtures."""
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+@pytest.fixture(autouse=True)
+def offline_tokenizer():
+    """Keep tests from downloading tiktoken's BPE files.
+
+    Token counts come from a stand-in encoding at about 4 characters per token.
+    """
+    encoding = MagicMock()
+    encoding.encode.side_effect = lambda text, **kwargs: [0] * (len(text) // 4)
+    with patch('tiktoken.encoding_for_model', return_value=encoding), \
+         patch('tiktoken.get_encoding', return_value=encoding):
+        yield encoding
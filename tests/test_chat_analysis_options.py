@@ -2,11 +2,12 @@
 
 import os
 import pytest
-from unittest.mock import MagicMock, patch, call
+from unittest.mock import ANY, MagicMock, patch, call
 from datetime import datetime
 
 from chat_analysis_options import ChatAnalysisOptions
 from configuration import Config
+from rate_limiter import RateLimiter
 
 @pytest.fixture
 def mock_args():
@@ -22,6 +23,10 @@ def mock_args():
     args.trends = None
     args.verify_format = False
     args.chat_id = None
+    args.batch = False
+    args.pack = None
+    args.max_workers = None
+    args.no_cache = False
     return args
 
 @pytest.fixture
@@ -40,6 +45,8 @@ def test_initialize_config(chat_analysis, mock_args):
     assert config.pdf_output_dir == mock_args.pdf_dir
     assert config.pdf_size_limit_mb == mock_args.pdf_size_limit
     assert config.start_date == mock_args.date
+    assert config.max_workers == Config.max_workers
+    assert config.use_response_cache is True
 
 def test_export_chat(chat_analysis, mock_args):
     """Test chat export functionality."""
@@ -60,7 +67,7 @@ def test_generate_pdfs(chat_analysis, mock_args):
     mock_args.pdf = 5
     mock_args.pdf_dir = "test_pdf_dir"
     
-    with patch('chat_analysis_options.PDFGenerator') as mock_pdf:
+    with patch('pdf_generator.PDFGenerator') as mock_pdf:
         chat_analysis.generate_pdfs()
         
         mock_pdf.assert_called_once_with(
@@ -103,9 +110,12 @@ def test_analyze_trends_single_chat(chat_analysis, mock_args):
         
         mock_trend.assert_called_once_with(
             output_dir=chat_analysis.config.research_folder,
-            force_reprocess=mock_args.force_reprocess
+            force_reprocess=mock_args.force_reprocess,
+            max_workers=chat_analysis.config.max_workers,
+            rate_limiter=ANY
         )
         mock_instance._process_file.assert_called_once_with(os.path.join("test_trends", "test_chat.md"))
+        mock_instance.close.assert_called_once()
 
 def test_analyze_trends_directory(chat_analysis, mock_args):
     """Test trend analysis for a directory."""
@@ -122,9 +132,25 @@ def test_analyze_trends_directory(chat_analysis, mock_args):
         
         mock_trend.assert_called_once_with(
             output_dir=chat_analysis.config.research_folder,
-            force_reprocess=mock_args.force_reprocess
+            force_reprocess=mock_args.force_reprocess,
+            max_workers=chat_analysis.config.max_workers,
+            rate_limiter=ANY
         )
         mock_instance.analyze_directory.assert_called_once_with("test_trends")
+        assert isinstance(mock_trend.call_args[1]['rate_limiter'], RateLimiter)
+        mock_instance.close.assert_called_once()
+
+def test_analyze_trends_closes_processor_on_error(chat_analysis, mock_args):
+    """Test that the trend processor's connections are closed when analysis fails."""
+    mock_args.trends = "test_trends"
+    
+    with patch('chat_analysis_options.TrendProcessor') as mock_trend:
+        mock_instance = mock_trend.return_value
+        mock_instance.analyze_directory.side_effect = Exception("Test error")
+        
+        chat_analysis.analyze_trends()
+        
+        mock_instance.close.assert_called_once()
 
 def test_analyze_chats_single(chat_analysis, mock_args):
     """Test analysis of a single chat."""
@@ -147,6 +173,19 @@ def test_analyze_chats_all(chat_analysis):
         
         mock_conv.assert_called_once_with(chat_analysis.config)
         mock_instance.analyze_all_chats_parallel.assert_called_once()
+        mock_instance.close.assert_called_once()
+
+def test_analyze_chats_batch(chat_analysis, mock_args):
+    """Test analysis of all chats through the Batch API."""
+    mock_args.batch = True
+    
+    with patch('chat_analysis_options.ConversationData') as mock_conv:
+        mock_instance = mock_conv.return_value
+        
+        chat_analysis.analyze_chats()
+        
+        mock_instance.analyze_all_chats_batch.assert_called_once()
+        mock_instance.analyze_all_chats_parallel.assert_not_called()
 
 def test_run_verify_format(chat_analysis, mock_args):
     """Test running verify format operation."""
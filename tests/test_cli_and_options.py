@@ -27,6 +27,10 @@ def sample_args():
     args.trends = None
     args.verify_format = False
     args.chat_id = None
+    args.batch = False
+    args.pack = None
+    args.max_workers = None
+    args.no_cache = False
     return args
 
 def test_cli_parser_defaults():
@@ -43,6 +47,10 @@ def test_cli_parser_defaults():
         assert args.trends is None
         assert args.verify_format is False
         assert args.chat_id is None
+        assert args.batch is False
+        assert args.pack is None
+        assert args.max_workers is None
+        assert args.no_cache is False
 
 def test_cli_parser_custom_values():
     """Test CLI parser with custom values."""
@@ -59,7 +67,11 @@ def test_cli_parser_custom_values():
         '--trends', 'analysis_dir',
         '--verify-format',
         '--chat-id', 'chat456',
-        '--force-reprocess'
+        '--force-reprocess',
+        '--batch',
+        '--pack', '4',
+        '--max-workers', '16',
+        '--no-cache'
     ]):
         args = CLIParser.parse_args()
         assert args.output == "custom_output"
@@ -73,6 +85,10 @@ def test_cli_parser_custom_values():
         assert args.verify_format is True
         assert args.chat_id == "chat456"
         assert args.force_reprocess is True
+        assert args.batch is True
+        assert args.pack == 4
+        assert args.max_workers == 16
+        assert args.no_cache is True
 
 def test_cli_parser_invalid_date():
     """Test CLI parser with invalid date format."""
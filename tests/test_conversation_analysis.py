@@ -1,13 +1,21 @@
 """Tests for the conversation analysis functionality."""
 
+import concurrent.futures
 import os
 import json
 import pytest
+import time
 from datetime import datetime
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, call, patch
+
+import httpx
+from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
 
 from configuration import Config
-from conversation_data import ConversationData
+from file_validator import FileValidator
+from conversation_data import (ConversationData, ANALYSIS_HASH_PREFIX, ANALYSIS_HASH_SUFFIX,
+                               MAX_TRANSCRIPT_CHARS, RATE_LIMIT_MAX_RETRIES,
+                               TRANSIENT_ERROR_MAX_RETRIES)
 
 @pytest.fixture
 def temp_dir(tmp_path):
@@ -163,6 +171,62 @@ Test
             assert "# 1. Brief Summary" in content
             assert "Existing analysis" in content
 
+def test_analyze_and_save_chat_existing_file_current_hash(conversation_data, temp_dir):
+    """Test skipping analysis when the saved hash matches the conversation."""
+    chat_id = "test_chat"
+    messages = [{"author": {"role": "user"}, "content": {"content_type": "text", "parts": ["Hello"]}}]
+    content_hash = conversation_data._content_hash(
+        conversation_data._format_conversation(messages).encode('utf-8'))
+
+    output_path = os.path.join(temp_dir, f"{chat_id}.md")
+    with open(output_path, 'w') as f:
+        f.write(f"<!-- h={content_hash} -->\n# 1. Brief Summary\nExisting analysis\n")
+
+    with patch.object(conversation_data.openai_client.chat.completions, 'create') as mock_create:
+        _, status = conversation_data.analyze_and_save_chat(chat_id, messages, temp_dir)
+
+    assert status == 'skipped'
+    mock_create.assert_not_called()
+
+def test_analyze_and_save_chat_skips_oversized_conversation(conversation_data, temp_dir):
+    """Test that an oversized conversation is skipped before it is fully formatted or counted."""
+    messages = [{"author": {"role": "user"}, "content": {"content_type": "text", "parts": ["x" * 100]}}] * 5
+    
+    with patch('conversation_data.MAX_TRANSCRIPT_CHARS', 250), \
+         patch.object(conversation_data, '_count_tokens') as mock_count, \
+         patch.object(conversation_data.openai_client.chat.completions, 'create') as mock_create:
+        _, status = conversation_data.analyze_and_save_chat("big_chat", messages, temp_dir)
+    
+    assert status == 'skipped'
+    mock_count.assert_not_called()
+    mock_create.assert_not_called()
+    assert conversation_data._format_conversation(messages, max_chars=250) is None
+    assert conversation_data._format_conversation(messages, max_chars=1000) is not None
+
+def test_analyze_and_save_chat_existing_file_stale_hash(conversation_data, temp_dir):
+    """Test re-analyzing a chat whose conversation changed since it was analyzed."""
+    chat_id = "test_chat"
+    messages = [{"author": {"role": "user"}, "content": {"content_type": "text", "parts": ["Hello again"]}}]
+
+    output_path = os.path.join(temp_dir, f"{chat_id}.md")
+    with open(output_path, 'w') as f:
+        f.write("<!-- h=0000000000000000 -->\n# 1. Brief Summary\nOutdated analysis\n")
+
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = "Updated analysis"
+    with patch.object(conversation_data.openai_client.chat.completions, 'create',
+                      return_value=mock_response) as mock_create, \
+         patch('file_validator.FileValidator.verify_md_content', return_value=True):
+        _, status = conversation_data.analyze_and_save_chat(chat_id, messages, temp_dir)
+
+    assert status == 'success'
+    mock_create.assert_called_once()
+    content_hash = conversation_data._content_hash(
+        conversation_data._format_conversation(messages).encode('utf-8'))
+    with open(output_path, 'r') as f:
+        assert f.read() == f"<!-- h={content_hash} -->\nUpdated analysis"
+
 def test_analyze_and_save_chat_too_long(conversation_data, temp_dir):
     """Test skipping analysis for chats that exceed token limit."""
     chat_id = "test_chat"
@@ -228,7 +292,7 @@ Test
 """
     
     with patch.object(conversation_data.openai_client.chat.completions, 'create', return_value=mock_response):
-        with patch.object(conversation_data, '_load_chat_data', return_value=chats):
+        with patch.object(conversation_data, '_iter_chat_data', return_value=iter(chats.items())):
             # Set research folder to temp_dir for testing
             conversation_data.config.research_folder = temp_dir
             conversation_data.analyze_all_chats_parallel()
@@ -244,6 +308,37 @@ Test
                     assert "# 3. Collaborative Pattern Analysis" in content
                     assert "# 4. Recommendations" in content
 
+def test_analyze_all_chats_parallel_checks_hash_of_capped_transcript(conversation_data, temp_dir):
+    """Test that current analyses are recognized using the same transcript cap they were hashed with."""
+    messages = [{"author": {"role": "user"}, "content": {"content_type": "text", "parts": ["Message"]}}]
+    conversation = conversation_data._format_conversation(messages, max_chars=MAX_TRANSCRIPT_CHARS)
+    content_hash = conversation_data._content_hash(conversation.encode('utf-8'))
+    with open(os.path.join(temp_dir, "chat1.md"), 'w') as f:
+        f.write(f"{ANALYSIS_HASH_PREFIX}{content_hash}{ANALYSIS_HASH_SUFFIX}\n# 1. Brief Summary\n")
+    
+    conversation_data.config.research_folder = temp_dir
+    with patch.object(conversation_data, '_iter_chat_data', return_value=iter([("chat1", messages)])), \
+         patch.object(conversation_data, '_format_conversation',
+                      wraps=conversation_data._format_conversation) as mock_format, \
+         patch.object(conversation_data, 'analyze_and_save_chat') as mock_analyze:
+        conversation_data.analyze_all_chats_parallel()
+    
+    mock_format.assert_called_once_with(messages, max_chars=MAX_TRANSCRIPT_CHARS)
+    mock_analyze.assert_not_called()
+
+def test_analyze_all_chats_parallel_skips_repeated_ids(conversation_data, temp_dir):
+    """Test that a conversation ID repeated in the export is only analyzed once."""
+    messages = [{"author": {"role": "user"}, "content": {"content_type": "text", "parts": ["Message"]}}]
+    chats = [("chat1", messages), ("chat1", messages), ("chat2", messages)]
+    
+    conversation_data.config.research_folder = temp_dir
+    with patch.object(conversation_data, '_iter_chat_data', return_value=iter(chats)), \
+         patch.object(conversation_data, 'analyze_and_save_chat',
+                      side_effect=lambda chat_id, *args: (chat_id, 'success')) as mock_analyze:
+        conversation_data.analyze_all_chats_parallel()
+    
+    assert sorted(call.args[0] for call in mock_analyze.call_args_list) == ["chat1", "chat2"]
+
 def test_analyze_chat_with_invalid_content(conversation_data, temp_dir):
     """Test analyzing a chat with invalid content types and missing fields."""
     chat_id = "test_chat"
@@ -356,7 +451,7 @@ Test
 """
     
     with patch.object(conversation_data.openai_client.chat.completions, 'create', return_value=mock_response), \
-         patch.object(conversation_data, '_load_chat_data', return_value=chats), \
+         patch.object(conversation_data, '_iter_chat_data', return_value=iter(chats.items())), \
          patch('conversation_data.ConversationData.analyze_and_save_chat') as mock_analyze:
         # Mock analyze_and_save_chat to fail for chat2
         def mock_analyze_impl(chat_id, messages, output_dir):
@@ -373,3 +468,867 @@ Test
         assert mock_analyze.call_count == 2
         assert mock_analyze.call_args_list[0][0][0] == "chat1"
         assert mock_analyze.call_args_list[1][0][0] == "chat2"
+
+def test_parallel_processing_survives_worker_crash(conversation_data, temp_dir, capsys):
+    """Test that an exception raised by one chat does not stop the run."""
+    chats = {
+        "chat1": [{"author": {"role": "user"}, "content": {"content_type": "text", "parts": ["One"]}}],
+        "chat2": [{"author": {"role": "user"}, "content": {"content_type": "text", "parts": ["Two"]}}]
+    }
+    
+    def mock_analyze_impl(chat_id, messages, output_dir):
+        if chat_id == "chat1":
+            raise OSError("disk full")
+        return os.path.join(output_dir, f"{chat_id}.md"), "success"
+    
+    with patch.object(conversation_data, '_iter_chat_data', return_value=iter(chats.items())), \
+         patch('conversation_data.ConversationData.analyze_and_save_chat', side_effect=mock_analyze_impl):
+        conversation_data.config.research_folder = temp_dir
+        conversation_data.analyze_all_chats_parallel()
+    
+    output = capsys.readouterr().out
+    assert "disk full" in output
+    assert "1/2 chats analyzed successfully" in output
+    assert "Failed due to API errors: 1 chats" in output
+
+def serve_batch_files(client, files):
+    """Serve each batch file's lines from a mock OpenAI client."""
+    def content(file_id):
+        response = MagicMock()
+        response.__enter__.return_value.iter_lines.return_value = iter(files[file_id])
+        return response
+    client.files.with_streaming_response.content.side_effect = content
+
+def test_analyze_all_chats_batch(conversation_data, temp_dir, capsys):
+    """Test analyzing chats through the OpenAI Batch API."""
+    chats = {
+        "chat1": [{"author": {"role": "user"}, "content": {"content_type": "text", "parts": ["Message 1"]}}],
+        "chat2": [{"author": {"role": "user"}, "content": {"content_type": "text", "parts": ["Message 2"]}}]
+    }
+    
+    analysis = """
+# 1. Brief Summary
+Analysis content
+
+# 2. Five-Step Decision Loop Analysis
+## Step 1: Problem Framing & Initial Prompting
+Test
+
+## Step 2: Response Evaluation & Validation
+Test
+
+## Step 3: Expertise Application
+Test
+
+## Step 4: Critical Assessment
+### 4.1 Loop Completion Analysis
+Test
+
+### 4.2 Breakdown Analysis
+Test
+
+## Step 5: Process Improvement
+Test
+
+# 3. Collaborative Pattern Analysis
+## Observed Patterns
+Test
+
+## Novel Patterns
+Test
+
+# 4. Recommendations
+Test
+"""
+    output_lines = [
+        json.dumps({
+            "custom_id": "chat1",
+            "response": {"status_code": 200, "body": {"choices": [{"message": {"content": analysis}}]}},
+            "error": None
+        }),
+    ]
+    error_lines = [
+        json.dumps({
+            "custom_id": "chat2",
+            "response": {"status_code": 429, "body": {"error": {"message": "Token limit reached"}}},
+            "error": None
+        })
+    ]
+    
+    mock_client = MagicMock()
+    mock_client.batches.create.return_value = MagicMock(id="batch_1")
+    mock_client.batches.retrieve.side_effect = [
+        MagicMock(status="in_progress"),
+        MagicMock(id="batch_1", status="completed", output_file_id="file_out", error_file_id="file_err")
+    ]
+    serve_batch_files(mock_client, {"file_out": output_lines, "file_err": error_lines})
+    
+    conversation_data.config.research_folder = temp_dir
+    with patch.object(conversation_data, 'openai_client', mock_client), \
+         patch.object(conversation_data, '_load_chat_data', return_value=chats), \
+         patch('conversation_data.time.sleep') as mock_sleep:
+        conversation_data.analyze_all_chats_batch()
+    
+    # One batch was submitted containing both chats
+    mock_client.files.create.assert_called_once()
+    assert mock_client.files.create.call_args[1]['purpose'] == 'batch'
+    assert mock_client.batches.create.call_args[1]['endpoint'] == '/v1/chat/completions'
+    mock_sleep.assert_called_once()
+    
+    # Only the successful result was saved, the failed request was reported
+    # and the request file was cleaned up
+    assert os.path.exists(os.path.join(temp_dir, "chat1.md"))
+    assert not os.path.exists(os.path.join(temp_dir, "chat2.md"))
+    assert "Batch request for chat chat2 failed: Token limit reached" in capsys.readouterr().out
+    assert sorted(os.listdir(temp_dir)) == [".cache", "chat1.md"]
+
+def test_analyze_all_chats_batch_resumes_interrupted_batch(conversation_data, temp_dir):
+    """Test that a batch still running when a run was interrupted is collected, not resubmitted."""
+    chats = {"chat1": [{"author": {"role": "user"}, "content": {"content_type": "text", "parts": ["Message 1"]}}]}
+    analysis = """
+# 1. Brief Summary
+Test
+
+# 2. Five-Step Decision Loop Analysis
+## Step 1: Problem Framing & Initial Prompting
+Test
+
+## Step 2: Response Evaluation & Validation
+Test
+
+## Step 3: Expertise Application
+Test
+
+## Step 4: Critical Assessment
+### 4.1 Loop Completion Analysis
+Test
+
+### 4.2 Breakdown Analysis
+Test
+
+## Step 5: Process Improvement
+Test
+
+# 3. Collaborative Pattern Analysis
+## Observed Patterns
+Test
+
+## Novel Patterns
+Test
+
+# 4. Recommendations
+Test
+"""
+    conversation_data.config.research_folder = temp_dir
+    
+    # First run is interrupted while polling
+    first_client = MagicMock()
+    first_client.batches.create.return_value = MagicMock(id="batch_1")
+    first_client.batches.retrieve.side_effect = KeyboardInterrupt
+    with patch.object(conversation_data, 'openai_client', first_client), \
+         patch.object(conversation_data, '_load_chat_data', return_value=chats):
+        with pytest.raises(KeyboardInterrupt):
+            conversation_data.analyze_all_chats_batch()
+    assert os.path.exists(os.path.join(temp_dir, "batch_state.json"))
+    
+    # Second run picks the same batch up
+    second_client = MagicMock()
+    second_client.batches.retrieve.return_value = MagicMock(
+        id="batch_1", status="completed", output_file_id="file_out", error_file_id=None
+    )
+    serve_batch_files(second_client, {"file_out": [json.dumps({
+        "custom_id": "chat1",
+        "response": {"status_code": 200, "body": {"choices": [{"message": {"content": analysis}}]}},
+        "error": None
+    })]})
+    with patch.object(conversation_data, 'openai_client', second_client), \
+         patch.object(conversation_data, '_load_chat_data', return_value=chats) as mock_load:
+        conversation_data.analyze_all_chats_batch()
+    
+    mock_load.assert_not_called()
+    second_client.files.create.assert_not_called()
+    second_client.batches.create.assert_not_called()
+    second_client.batches.retrieve.assert_called_once_with("batch_1")
+    assert os.path.exists(os.path.join(temp_dir, "chat1.md"))
+    assert not os.path.exists(os.path.join(temp_dir, "batch_state.json"))
+
+def test_analyze_all_chats_batch_upload_failure_cleans_up(conversation_data, temp_dir):
+    """Test that the request file is removed when uploading it fails."""
+    chats = {"chat1": [{"author": {"role": "user"}, "content": {"content_type": "text", "parts": ["Message 1"]}}]}
+    mock_client = MagicMock()
+    mock_client.files.create.side_effect = Exception("Upload failed")
+    
+    conversation_data.config.research_folder = temp_dir
+    with patch.object(conversation_data, 'openai_client', mock_client), \
+         patch.object(conversation_data, '_load_chat_data', return_value=chats):
+        with pytest.raises(Exception, match="Upload failed"):
+            conversation_data.analyze_all_chats_batch()
+    
+    mock_client.batches.create.assert_not_called()
+    assert os.listdir(temp_dir) == []
+
+def test_analyze_all_chats_batch_splits_at_batch_limits(conversation_data, temp_dir):
+    """Test that requests over a batch's limits are spread over several batches."""
+    chats = {
+        f"chat{i}": [{"author": {"role": "user"}, "content": {"content_type": "text", "parts": [f"Message {i}"]}}]
+        for i in range(3)
+    }
+    mock_client = MagicMock()
+    mock_client.files.create.side_effect = lambda file, purpose: MagicMock(id=f"file_{len(file.read())}")
+    mock_client.batches.create.side_effect = [MagicMock(id="batch_1"), MagicMock(id="batch_2")]
+    mock_client.batches.retrieve.side_effect = lambda batch_id: MagicMock(
+        status="completed", output_file_id=None, error_file_id=None)
+    
+    conversation_data.config.research_folder = temp_dir
+    with patch.object(conversation_data, 'openai_client', mock_client), \
+         patch.object(conversation_data, '_load_chat_data', return_value=chats), \
+         patch('conversation_data.BATCH_MAX_REQUESTS', 2):
+        conversation_data.analyze_all_chats_batch()
+    
+    assert mock_client.files.create.call_count == 2
+    assert mock_client.batches.create.call_count == 2
+    assert [c.args[0] for c in mock_client.batches.retrieve.call_args_list] == ["batch_1", "batch_2"]
+    assert os.listdir(temp_dir) == []
+
+def test_analyze_all_chats_batch_records_batches_before_a_failed_upload(conversation_data, temp_dir):
+    """Test that batches started before a failed upload are still collected by the next run."""
+    chats = {
+        f"chat{i}": [{"author": {"role": "user"}, "content": {"content_type": "text", "parts": [f"Message {i}"]}}]
+        for i in range(2)
+    }
+    mock_client = MagicMock()
+    mock_client.files.create.side_effect = [MagicMock(id="file_1"), Exception("Upload failed")]
+    mock_client.batches.create.return_value = MagicMock(id="batch_1")
+    
+    conversation_data.config.research_folder = temp_dir
+    with patch.object(conversation_data, 'openai_client', mock_client), \
+         patch.object(conversation_data, '_load_chat_data', return_value=chats), \
+         patch('conversation_data.BATCH_MAX_REQUESTS', 1):
+        with pytest.raises(Exception, match="Upload failed"):
+            conversation_data.analyze_all_chats_batch()
+    
+    assert os.listdir(temp_dir) == ["batch_state.json"]
+    assert conversation_data._load_batch_state(os.path.join(temp_dir, "batch_state.json"))['batch_ids'] == ["batch_1"]
+
+def test_analyze_all_chats_batch_skips_existing(conversation_data, temp_dir):
+    """Test that the batch path does not submit chats that were already analyzed."""
+    chats = {"chat1": [{"author": {"role": "user"}, "content": {"content_type": "text", "parts": ["Hi"]}}]}
+    with open(os.path.join(temp_dir, "chat1.md"), 'w') as f:
+        f.write("# 1. Brief Summary\nExisting analysis")
+    
+    mock_client = MagicMock()
+    conversation_data.config.research_folder = temp_dir
+    with patch.object(conversation_data, 'openai_client', mock_client), \
+         patch.object(conversation_data, '_load_chat_data', return_value=chats):
+        conversation_data.analyze_all_chats_batch()
+    
+    mock_client.files.create.assert_not_called()
+    mock_client.batches.create.assert_not_called()
+
+def test_analyze_all_chats_packed(conversation_data, temp_dir):
+    """Test that small chats are packed into one request and saved separately."""
+    chats = {
+        "chat1": [{"author": {"role": "user"}, "content": {"content_type": "text", "parts": ["Message 1"]}}],
+        "chat2": [{"author": {"role": "user"}, "content": {"content_type": "text", "parts": ["Message 2"]}}]
+    }
+    analysis = """
+# 1. Brief Summary
+Test
+
+# 2. Five-Step Decision Loop Analysis
+## Step 1: Problem Framing & Initial Prompting
+Test
+
+## Step 2: Response Evaluation & Validation
+Test
+
+## Step 3: Expertise Application
+Test
+
+## Step 4: Critical Assessment
+### 4.1 Loop Completion Analysis
+Test
+
+### 4.2 Breakdown Analysis
+Test
+
+## Step 5: Process Improvement
+Test
+
+# 3. Collaborative Pattern Analysis
+## Observed Patterns
+Test
+
+## Novel Patterns
+Test
+
+# 4. Recommendations
+Test
+"""
+    packed_response = MagicMock()
+    packed_response.choices = [MagicMock()]
+    # chat2 is missing from the packed response
+    packed_response.choices[0].message.content = json.dumps({"chat1": analysis})
+    single_response = MagicMock()
+    single_response.choices = [MagicMock()]
+    single_response.choices[0].message.content = analysis
+    
+    conversation_data.config.research_folder = temp_dir
+    conversation_data.config.pack_size = 4
+    with patch.object(conversation_data.openai_client.chat.completions, 'create',
+                      side_effect=[packed_response, single_response]) as mock_create, \
+         patch.object(conversation_data, '_iter_chat_data', return_value=iter(chats.items())):
+        conversation_data.analyze_all_chats_parallel()
+    
+    # Both chats went out in a single JSON-mode request
+    assert mock_create.call_count == 2
+    kwargs = mock_create.call_args_list[0][1]
+    assert kwargs['response_format'] == {"type": "json_object"}
+    user_message = kwargs['messages'][1]['content']
+    assert "===CHAT chat1===" in user_message
+    assert "===CHAT chat2===" in user_message
+    
+    # chat2 was then retried on its own
+    retry_kwargs = mock_create.call_args_list[1][1]
+    assert 'response_format' not in retry_kwargs
+    assert "Message 2" in retry_kwargs['messages'][1]['content']
+    assert "===CHAT" not in retry_kwargs['messages'][1]['content']
+    
+    assert os.path.exists(os.path.join(temp_dir, "chat1.md"))
+    assert os.path.exists(os.path.join(temp_dir, "chat2.md"))
+
+def test_pack_chats_respects_limits(conversation_data):
+    """Test that packing honours the pack size and skips oversized chats."""
+    def chat(text):
+        return [{"author": {"role": "user"}, "content": {"content_type": "text", "parts": [text]}}]
+    
+    conversation_data.config.pack_size = 2
+    conversation_data.config.pack_max_chars = 100
+    chats = [("a", chat("x")), ("b", chat("y")), ("c", chat("z")), ("big", chat("w" * 200))]
+    
+    packs, singles = conversation_data._pack_chats(chats)
+    
+    assert [[chat_id for chat_id, _ in pack] for pack in packs] == [["a", "b"]]
+    assert sorted(chat_id for chat_id, _ in singles) == ["big", "c"]
+
+def test_pack_chats_leaves_cached_and_duplicate_chats_unpacked(conversation_data, temp_dir):
+    """Test that cached chats and duplicates of packed chats are not packed again."""
+    def chat(text):
+        return [{"author": {"role": "user"}, "content": {"content_type": "text", "parts": [text]}}]
+    
+    conversation_data.config.research_folder = temp_dir
+    conversation_data.config.pack_size = 4
+    cached_path = conversation_data._cache_path(
+        conversation_data._format_conversation(chat("cached")).encode('utf-8'), temp_dir)
+    os.makedirs(os.path.dirname(cached_path))
+    with open(cached_path, 'w') as f:
+        f.write("# 1. Brief Summary\nCached analysis")
+    chats = [("a", chat("x")), ("a_copy", chat("x")), ("b", chat("y")), ("c", chat("cached"))]
+    
+    packs, singles = conversation_data._pack_chats(chats)
+    
+    assert [[chat_id for chat_id, _ in pack] for pack in packs] == [["a", "b"]]
+    assert sorted(chat_id for chat_id, _ in singles) == ["a_copy", "c"]
+
+def test_analyze_and_save_pack_caches_results(conversation_data, temp_dir):
+    """Test that packed analyses populate the response cache."""
+    analysis = """
+# 1. Brief Summary
+Test
+
+# 2. Five-Step Decision Loop Analysis
+## Step 1: Problem Framing & Initial Prompting
+Test
+
+## Step 2: Response Evaluation & Validation
+Test
+
+## Step 3: Expertise Application
+Test
+
+## Step 4: Critical Assessment
+### 4.1 Loop Completion Analysis
+Test
+
+### 4.2 Breakdown Analysis
+Test
+
+## Step 5: Process Improvement
+Test
+
+# 3. Collaborative Pattern Analysis
+## Observed Patterns
+Test
+
+## Novel Patterns
+Test
+
+# 4. Recommendations
+Test
+"""
+    pack = [("chat1", "user: Message 1\n"), ("chat2", "user: Message 2\n")]
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = json.dumps({"chat1": analysis, "chat2": analysis})
+    
+    with patch.object(conversation_data.openai_client.chat.completions, 'create',
+                      return_value=mock_response) as mock_create:
+        results = conversation_data.analyze_and_save_pack(pack, temp_dir)
+        # A repeat of the same chats is served from the cache
+        repeat = conversation_data.analyze_and_save_pack(pack, temp_dir)
+    
+    assert [status for _, status in results] == ['success', 'success']
+    assert [status for _, status in repeat] == ['success', 'success']
+    mock_create.assert_called_once()
+    for chat_id, conversation in pack:
+        assert os.path.exists(conversation_data._cache_path(conversation.encode('utf-8'), temp_dir))
+
+def test_analyze_and_save_chat_streaming(conversation_data, temp_dir):
+    """Test that a streamed analysis is written from its deltas and validated."""
+    chat_id = "test_chat"
+    messages = [{"author": {"role": "user"}, "content": {"content_type": "text", "parts": ["Hello"]}}]
+    sections = [
+        "# 1. Brief Summary\nTest\n\n",
+        "# 2. Five-Step Decision Loop Analysis\n## Step 1: Problem Framing & Initial Prompting\nTest\n\n",
+        "## Step 2: Response Evaluation & Validation\nTest\n\n## Step 3: Expertise Application\nTest\n\n",
+        "## Step 4: Critical Assessment\n### 4.1 Loop Completion Analysis\nTest\n\n",
+        "### 4.2 Breakdown Analysis\nTest\n\n## Step 5: Process Improvement\nTest\n\n",
+        "# 3. Collaborative Pattern Analysis\n## Observed Patterns\nTest\n\n## Novel Patterns\nTest\n\n# 4. Recomm",
+        "endations\nTest\n"
+    ]
+    chunks = []
+    for text in sections + [None]:
+        chunk = MagicMock()
+        chunk.choices = [MagicMock()]
+        chunk.choices[0].delta.content = text
+        chunks.append(chunk)
+    
+    conversation_data.config.stream_responses = True
+    with patch.object(conversation_data.openai_client.chat.completions, 'create',
+                      return_value=iter(chunks)) as mock_create:
+        output_path, status = conversation_data.analyze_and_save_chat(chat_id, messages, temp_dir)
+    
+    assert status == 'success'
+    assert mock_create.call_args[1]['stream'] is True
+    with open(output_path, 'r') as f:
+        assert f.readline().startswith('<!-- h=')
+        assert f.read() == ''.join(sections)
+    assert not os.path.exists(output_path + '.tmp')
+
+def test_stream_analysis_reports_open_failure(conversation_data, temp_dir):
+    """Test that a temp file that can't be created is reported as itself."""
+    conversation_data.config.stream_responses = True
+    with patch.object(conversation_data.openai_client.chat.completions, 'create',
+                      return_value=iter([])), \
+         patch('builtins.open', side_effect=PermissionError("denied")):
+        with pytest.raises(PermissionError):
+            conversation_data._stream_analysis("chat1", "user: Hello\n", temp_dir, "hash")
+
+def test_stream_analysis_removes_partial_file(conversation_data, temp_dir):
+    """Test that a stream failing partway leaves no temp file behind."""
+    def failing_stream():
+        chunk = MagicMock()
+        chunk.choices = [MagicMock()]
+        chunk.choices[0].delta.content = "# 1. Brief Summary\n"
+        yield chunk
+        raise APIConnectionError(request=MagicMock())
+    
+    with patch.object(conversation_data.openai_client.chat.completions, 'create',
+                      return_value=failing_stream()):
+        with pytest.raises(APIConnectionError):
+            conversation_data._stream_analysis("chat1", "user: Hello\n", temp_dir, "hash")
+    
+    assert os.listdir(temp_dir) == []
+
+def test_analyze_and_save_chat_reuses_cached_analysis(conversation_data, temp_dir):
+    """Test that identical conversations are only sent to OpenAI once."""
+    messages = [{"author": {"role": "user"}, "content": {"content_type": "text", "parts": ["Same question"]}}]
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = """
+# 1. Brief Summary
+Test
+
+# 2. Five-Step Decision Loop Analysis
+## Step 1: Problem Framing & Initial Prompting
+Test
+
+## Step 2: Response Evaluation & Validation
+Test
+
+## Step 3: Expertise Application
+Test
+
+## Step 4: Critical Assessment
+### 4.1 Loop Completion Analysis
+Test
+
+### 4.2 Breakdown Analysis
+Test
+
+## Step 5: Process Improvement
+Test
+
+# 3. Collaborative Pattern Analysis
+## Observed Patterns
+Test
+
+## Novel Patterns
+Test
+
+# 4. Recommendations
+Test
+"""
+    
+    with patch.object(conversation_data.openai_client.chat.completions, 'create',
+                      return_value=mock_response) as mock_create:
+        first_path, first_status = conversation_data.analyze_and_save_chat("chat1", messages, temp_dir)
+        second_path, second_status = conversation_data.analyze_and_save_chat("chat2", messages, temp_dir)
+    
+    assert first_status == 'success'
+    assert second_status == 'success'
+    mock_create.assert_called_once()
+    with open(first_path, 'r') as f1, open(second_path, 'r') as f2:
+        assert f1.read() == f2.read()
+
+def test_analyze_and_save_chat_no_cache_redoes_stale_analysis(conversation_data, temp_dir):
+    """Test that with the cache off, deleted analyses are redone but duplicates still share a request."""
+    messages = [{"author": {"role": "user"}, "content": {"content_type": "text", "parts": ["Same question"]}}]
+    conversation = conversation_data._format_conversation(messages)
+    cache_path = conversation_data._cache_path(conversation.encode('utf-8'), temp_dir)
+    os.makedirs(os.path.dirname(cache_path))
+    with open(cache_path, 'w') as f:
+        f.write("Stale analysis")
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = ''.join(
+        f"{section}\nTest\n\n" for section in FileValidator.REQUIRED_SECTIONS)
+    
+    conversation_data.config.use_response_cache = False
+    with patch.object(conversation_data.openai_client.chat.completions, 'create',
+                      return_value=mock_response) as mock_create:
+        first_path, first_status = conversation_data.analyze_and_save_chat("chat1", messages, temp_dir)
+        second_path, second_status = conversation_data.analyze_and_save_chat("chat2", messages, temp_dir)
+    
+    assert (first_status, second_status) == ('success', 'success')
+    mock_create.assert_called_once()
+    with open(cache_path, 'r') as cached, open(second_path, 'r') as f:
+        assert cached.read() == f.read() != "Stale analysis"
+
+def test_cache_analysis_links_instead_of_copying(conversation_data, temp_dir):
+    """Test that a cached analysis shares its file with the saved analysis."""
+    filepath = os.path.join(temp_dir, "chat1.md")
+    with open(filepath, 'w') as f:
+        f.write("Analysis")
+    cache_path = os.path.join(temp_dir, '.cache', 'key.md')
+    
+    conversation_data._cache_analysis((filepath, 'success'), cache_path)
+    
+    assert os.path.samefile(filepath, cache_path)
+    assert sorted(os.listdir(os.path.dirname(cache_path))) == ['key.md']
+
+def test_analyze_and_save_chat_waits_for_identical_chat_in_flight(conversation_data, temp_dir):
+    """Test that identical chats analyzed concurrently share one OpenAI request."""
+    messages = [{"author": {"role": "user"}, "content": {"content_type": "text", "parts": ["Same question"]}}]
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = """
+# 1. Brief Summary
+Test
+
+# 2. Five-Step Decision Loop Analysis
+## Step 1: Problem Framing & Initial Prompting
+Test
+
+## Step 2: Response Evaluation & Validation
+Test
+
+## Step 3: Expertise Application
+Test
+
+## Step 4: Critical Assessment
+### 4.1 Loop Completion Analysis
+Test
+
+### 4.2 Breakdown Analysis
+Test
+
+## Step 5: Process Improvement
+Test
+
+# 3. Collaborative Pattern Analysis
+## Observed Patterns
+Test
+
+## Novel Patterns
+Test
+
+# 4. Recommendations
+Test
+"""
+    
+    def slow_create(**kwargs):
+        # Keep the first request in flight while the duplicate arrives
+        time.sleep(0.2)
+        return mock_response
+    
+    with patch.object(conversation_data.openai_client.chat.completions, 'create',
+                      side_effect=slow_create) as mock_create, \
+         concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(conversation_data.analyze_and_save_chat, chat_id, messages, temp_dir)
+                   for chat_id in ("chat1", "chat2")]
+        results = [future.result() for future in futures]
+    
+    assert [status for _, status in results] == ['success', 'success']
+    mock_create.assert_called_once()
+    # Locks are released once no worker needs them
+    assert conversation_data._cache_entry_locks == {}
+
+def test_analyze_all_chats_batch_deduplicates(conversation_data, temp_dir):
+    """Test that identical chats share one batch request and both get the result."""
+    messages = [{"author": {"role": "user"}, "content": {"content_type": "text", "parts": ["Same question"]}}]
+    chats = {"chat1": messages, "chat2": list(messages)}
+    analysis = """
+# 1. Brief Summary
+Test
+
+# 2. Five-Step Decision Loop Analysis
+## Step 1: Problem Framing & Initial Prompting
+Test
+
+## Step 2: Response Evaluation & Validation
+Test
+
+## Step 3: Expertise Application
+Test
+
+## Step 4: Critical Assessment
+### 4.1 Loop Completion Analysis
+Test
+
+### 4.2 Breakdown Analysis
+Test
+
+## Step 5: Process Improvement
+Test
+
+# 3. Collaborative Pattern Analysis
+## Observed Patterns
+Test
+
+## Novel Patterns
+Test
+
+# 4. Recommendations
+Test
+"""
+    uploaded = []
+    
+    def capture_upload(file, purpose):
+        uploaded.extend(line for line in file.read().decode().splitlines() if line)
+        return MagicMock(id="file_in")
+    
+    mock_client = MagicMock()
+    mock_client.files.create.side_effect = capture_upload
+    mock_client.batches.create.return_value = MagicMock(id="batch_1")
+    mock_client.batches.retrieve.return_value = MagicMock(
+        id="batch_1", status="completed", output_file_id="file_out"
+    )
+    mock_output = mock_client.files.with_streaming_response.content.return_value.__enter__.return_value
+    mock_output.iter_lines.return_value = iter([json.dumps({
+        "custom_id": "chat1",
+        "response": {"status_code": 200, "body": {"choices": [{"message": {"content": analysis}}]}},
+        "error": None
+    })])
+    
+    conversation_data.config.research_folder = temp_dir
+    with patch.object(conversation_data, 'openai_client', mock_client), \
+         patch.object(conversation_data, '_load_chat_data', return_value=chats):
+        conversation_data.analyze_all_chats_batch()
+    
+    assert len(uploaded) == 1
+    assert json.loads(uploaded[0])["custom_id"] == "chat1"
+    for chat_id in chats:
+        with open(os.path.join(temp_dir, f"{chat_id}.md"), 'r') as f:
+            assert f.readline().startswith('<!-- h=')
+            assert f.read() == analysis
+
+def test_record_usage_tracks_cached_prompt_tokens(conversation_data):
+    """Test that prompt and cached token counts are accumulated from responses."""
+    usage = MagicMock(prompt_tokens=2000)
+    usage.prompt_tokens_details.cached_tokens = 1536
+    
+    conversation_data._record_usage(usage)
+    conversation_data._record_usage(usage)
+    conversation_data._record_usage(None)
+    
+    assert conversation_data.prompt_tokens == 4000
+    assert conversation_data.cached_prompt_tokens == 3072
+
+def test_count_tokens_uses_model_encoding(conversation_data):
+    """Test that token counts come from the model's tokenizer."""
+    mock_encoding = MagicMock()
+    mock_encoding.encode.return_value = [1, 2, 3]
+    with patch('conversation_data.tiktoken.encoding_for_model', return_value=mock_encoding) as mock_for_model:
+        assert conversation_data._count_tokens("some text") == 3
+        assert conversation_data._count_tokens("more text") == 3
+    
+    # The encoding is loaded once and reused
+    mock_for_model.assert_called_once_with(conversation_data.config.model)
+
+def test_count_tokens_falls_back_without_encoding(conversation_data):
+    """Test that token counts are estimated when the tokenizer can't be loaded."""
+    with patch('conversation_data.tiktoken.encoding_for_model', side_effect=OSError("offline")), \
+         patch('conversation_data.logging.warning') as mock_warning:
+        assert conversation_data._count_tokens("x" * 400) == 100
+    
+    mock_warning.assert_called_once()
+
+def test_http_client_created_once_across_threads(conversation_data):
+    """Test that worker threads racing to first use share one HTTP client."""
+    def slow_create(max_workers):
+        time.sleep(0.05)
+        return MagicMock()
+    
+    with patch('conversation_data.create_http_client', side_effect=slow_create) as mock_create, \
+         concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        clients = list(executor.map(lambda _: conversation_data.http_client, range(8)))
+    
+    mock_create.assert_called_once()
+    assert all(client is clients[0] for client in clients)
+
+def test_openai_client_disables_sdk_retries(conversation_data):
+    """Test that only _create_completion retries, not the OpenAI SDK as well."""
+    assert conversation_data.openai_client.max_retries == 0
+
+def test_create_completion_retries_rate_limits(conversation_data):
+    """Test that rate-limited requests are retried with backoff."""
+    rate_limited = RateLimitError("Rate limit reached", response=MagicMock(status_code=429), body=None)
+    mock_response = MagicMock()
+    
+    with patch.object(conversation_data.openai_client.chat.completions, 'create',
+                      side_effect=[rate_limited, rate_limited, mock_response]) as mock_create, \
+         patch('conversation_data.time.sleep') as mock_sleep:
+        response = conversation_data._create_completion(0, model="gpt-4o", messages=[])
+    
+    assert response is mock_response
+    assert mock_create.call_count == 3
+    assert mock_sleep.call_count == 2
+
+def test_create_completion_gives_up_after_max_retries(conversation_data):
+    """Test that a persistent rate limit is raised once retries run out."""
+    rate_limited = RateLimitError("Rate limit reached", response=MagicMock(status_code=429), body=None)
+    
+    with patch.object(conversation_data.openai_client.chat.completions, 'create',
+                      side_effect=rate_limited) as mock_create, \
+         patch('conversation_data.time.sleep'):
+        with pytest.raises(RateLimitError):
+            conversation_data._create_completion(0, model="gpt-4o", messages=[])
+    
+    assert mock_create.call_count == 7
+
+def test_create_completion_fails_fast_without_quota(conversation_data):
+    """Test that an exhausted quota is raised at once instead of retried."""
+    out_of_quota = RateLimitError("You exceeded your current quota", response=MagicMock(status_code=429), body=None)
+    out_of_quota.code = 'insufficient_quota'
+    
+    with patch.object(conversation_data.openai_client.chat.completions, 'create',
+                      side_effect=out_of_quota) as mock_create, \
+         patch('conversation_data.time.sleep') as mock_sleep:
+        with pytest.raises(RateLimitError):
+            conversation_data._create_completion(0, model="gpt-4o", messages=[])
+    
+    mock_create.assert_called_once()
+    mock_sleep.assert_not_called()
+
+def test_create_completion_acquires_rate_limit_for_each_attempt(conversation_data):
+    """Test that retries count against the rate limiter like first attempts."""
+    rate_limited = RateLimitError("Rate limit reached", response=MagicMock(status_code=429), body=None)
+    
+    with patch.object(conversation_data.openai_client.chat.completions, 'create',
+                      side_effect=[rate_limited, MagicMock()]), \
+         patch.object(conversation_data.rate_limiter, 'acquire') as mock_acquire, \
+         patch('conversation_data.time.sleep'):
+        conversation_data._create_completion(500, model="gpt-4o", messages=[])
+    
+    assert mock_acquire.call_args_list == [call(500), call(500)]
+
+def test_create_completion_retries_transient_errors(conversation_data):
+    """Test that connection failures and 5xx errors are retried."""
+    connection_error = APIConnectionError(request=MagicMock())
+    server_error = InternalServerError("Server error", response=MagicMock(status_code=500), body=None)
+    mock_response = MagicMock()
+    
+    with patch.object(conversation_data.openai_client.chat.completions, 'create',
+                      side_effect=[connection_error, server_error, mock_response]) as mock_create, \
+         patch('conversation_data.time.sleep') as mock_sleep:
+        response = conversation_data._create_completion(0, model="gpt-4o", messages=[])
+    
+    assert response is mock_response
+    assert mock_create.call_count == 3
+    assert mock_sleep.call_count == 2
+
+def test_create_completion_does_not_resend_timeouts(conversation_data):
+    """Test that a timed out request is not sent (and billed) again."""
+    with patch.object(conversation_data.openai_client.chat.completions, 'create',
+                      side_effect=APITimeoutError(request=MagicMock())) as mock_create, \
+         patch('conversation_data.time.sleep') as mock_sleep:
+        with pytest.raises(APITimeoutError):
+            conversation_data._create_completion(0, model="gpt-4o", messages=[])
+    
+    mock_create.assert_called_once()
+    mock_sleep.assert_not_called()
+
+def test_create_completion_gives_up_on_persistent_server_errors(conversation_data):
+    """Test that a persistent 5xx error is raised after a few attempts."""
+    server_error = InternalServerError("Server error", response=MagicMock(status_code=503), body=None)
+    
+    with patch.object(conversation_data.openai_client.chat.completions, 'create',
+                      side_effect=server_error) as mock_create, \
+         patch('conversation_data.time.sleep'):
+        with pytest.raises(InternalServerError):
+            conversation_data._create_completion(0, model="gpt-4o", messages=[])
+    
+    assert mock_create.call_count == 3
+
+def test_create_completion_honors_retry_after(conversation_data):
+    """Test that the Retry-After header sets the wait before retrying."""
+    response = MagicMock(status_code=429, headers={"retry-after": "7"})
+    rate_limited = RateLimitError("Rate limit reached", response=response, body=None)
+    
+    with patch.object(conversation_data.openai_client.chat.completions, 'create',
+                      side_effect=[rate_limited, MagicMock()]), \
+         patch('conversation_data.time.sleep') as mock_sleep:
+        conversation_data._create_completion(0, model="gpt-4o", messages=[])
+    
+    mock_sleep.assert_called_once_with(7.0)
+
+def refuse_connection(request):
+    """Mock transport handler for a server that can't be reached."""
+    raise httpx.ConnectError("Connection refused", request=request)
+
+@pytest.mark.parametrize("failure, expected_attempts", [
+    (lambda request: httpx.Response(429, json={"error": {"message": "Rate limit reached"}}),
+     RATE_LIMIT_MAX_RETRIES + 1),
+    (lambda request: httpx.Response(500, json={"error": {"message": "Server error"}}),
+     TRANSIENT_ERROR_MAX_RETRIES + 1),
+    (refuse_connection, TRANSIENT_ERROR_MAX_RETRIES + 1),
+])
+def test_create_completion_http_attempts_are_bounded(conversation_data, failure, expected_attempts):
+    """Test the number of HTTP requests a persistent failure causes, end to end.
+    
+    Only _create_completion may retry; the OpenAI SDK and the transport must
+    not add attempts of their own.
+    """
+    attempts = []
+    
+    def handler(request):
+        attempts.append(request)
+        return failure(request)
+    
+    conversation_data.http_client = httpx.Client(transport=httpx.MockTransport(handler))
+    with patch('conversation_data.time.sleep'):
+        with pytest.raises(Exception):
+            conversation_data._create_completion(0, model="gpt-4o", messages=[])
+    
+    assert len(attempts) == expected_attempts
@@ -3,7 +3,8 @@
 import json
 import os
 import pytest
-from unittest.mock import mock_open, patch
+from datetime import date
+from unittest.mock import patch
 
 from configuration import Config
 from conversation_data import ConversationData
@@ -52,104 +53,197 @@ def sample_conversations():
         }
     ]
 
-def test_export_chat_history_json(conversation_data, sample_conversations, temp_dir):
+@pytest.fixture
+def conversations_file(config, sample_conversations):
+    """Write the sample conversations to conversations.json."""
+    os.makedirs(config.convo_folder, exist_ok=True)
+    path = os.path.join(config.convo_folder, "conversations.json")
+    with open(path, "w") as f:
+        json.dump(sample_conversations, f)
+    return path
+
+def test_export_chat_history_json(conversation_data, conversations_file, temp_dir):
     """Test exporting chat history to JSON."""
     chat_id = "test_chat"
-    
-    # Create necessary directories
     exports_dir = os.path.join(os.path.dirname(conversation_data.config.research_folder), 'exports')
-    os.makedirs(exports_dir, exist_ok=True)
-    
-    # Mock file operations
-    mock_json = json.dumps(sample_conversations)
-    with patch("builtins.open", mock_open(read_data=mock_json)) as mock_file:
-        with patch("os.path.exists") as mock_exists:
-            mock_exists.return_value = True
-            
-            output_path = conversation_data.export_chat_history(chat_id, "json")
-            
-            # Check that the correct files were opened
-            mock_file.assert_any_call(os.path.join(conversation_data.config.convo_folder, "conversations.json"), "r")
-            mock_file.assert_any_call(os.path.join(exports_dir, f"{chat_id}.json"), "w")
-            
-            assert output_path == os.path.join(exports_dir, f"{chat_id}.json")
-
-def test_export_chat_history_txt(conversation_data, sample_conversations, temp_dir):
+    
+    output_path = conversation_data.export_chat_history(chat_id, "json")
+    
+    assert output_path == os.path.join(exports_dir, f"{chat_id}.json")
+    with open(output_path) as f:
+        exported = json.load(f)
+    assert exported["id"] == chat_id
+    assert exported["current_node"] == "msg_2"
+
+def test_export_chat_history_txt(conversation_data, conversations_file, temp_dir):
     """Test exporting chat history to TXT format."""
     chat_id = "test_chat"
-    
-    # Create necessary directories
     exports_dir = os.path.join(os.path.dirname(conversation_data.config.research_folder), 'exports')
-    os.makedirs(exports_dir, exist_ok=True)
-    
-    # Mock file operations
-    mock_json = json.dumps(sample_conversations)
-    with patch("builtins.open", mock_open(read_data=mock_json)) as mock_file:
-        with patch("os.path.exists") as mock_exists:
-            mock_exists.return_value = True
-            
-            output_path = conversation_data.export_chat_history(chat_id, "txt")
-            
-            # Check that the correct files were opened
-            mock_file.assert_any_call(os.path.join(conversation_data.config.convo_folder, "conversations.json"), "r")
-            mock_file.assert_any_call(os.path.join(exports_dir, f"{chat_id}.txt"), "w")
-            
-            assert output_path == os.path.join(exports_dir, f"{chat_id}.txt")
-
-def test_export_chat_history_invalid_chat(conversation_data, sample_conversations, temp_dir):
+    
+    output_path = conversation_data.export_chat_history(chat_id, "txt")
+    
+    assert output_path == os.path.join(exports_dir, f"{chat_id}.txt")
+    with open(output_path) as f:
+        content = f.read()
+    assert f"Chat Export - ID: {chat_id}" in content
+
+def test_export_chat_history_non_ascii(conversation_data, config, temp_dir):
+    """Test that non-ASCII content exports as UTF-8 and the JSON round-trips exactly."""
+    text = "Café ☕ – 日本語のテキスト 🚀"
+    conversation = {
+        "id": "unicode_chat",
+        "title": "Ünïcödé",
+        "create_time": 1700000000.123456,
+        "current_node": "msg_1",
+        "mapping": {
+            "msg_1": {
+                "children": [],
+                "message": {
+                    "author": {"role": "user"},
+                    "create_time": 1700000000.5,
+                    "content": {"content_type": "text", "parts": [text]}
+                }
+            }
+        }
+    }
+    os.makedirs(config.convo_folder, exist_ok=True)
+    with open(os.path.join(config.convo_folder, "conversations.json"), "w", encoding="utf-8") as f:
+        json.dump([conversation], f, ensure_ascii=False)
+    
+    json_path = conversation_data.export_chat_history("unicode_chat", "json")
+    with open(json_path, 'rb') as f:
+        raw = f.read()
+    assert json.loads(raw.decode('utf-8')) == conversation
+    assert text.encode('utf-8') in raw
+    
+    txt_path = conversation_data.export_chat_history("unicode_chat", "txt")
+    with open(txt_path, encoding='utf-8') as f:
+        assert text in f.read()
+
+def test_export_chat_history_invalid_chat(conversation_data, conversations_file, temp_dir):
     """Test exporting non-existent chat."""
-    # Create necessary directories
-    exports_dir = os.path.join(os.path.dirname(conversation_data.config.research_folder), 'exports')
-    os.makedirs(exports_dir, exist_ok=True)
-    
-    # Mock file operations
-    mock_json = json.dumps(sample_conversations)
-    with patch("builtins.open", mock_open(read_data=mock_json)) as mock_file:
-        with patch("os.path.exists") as mock_exists:
-            mock_exists.return_value = True
-            
-            with pytest.raises(ValueError, match="Chat invalid_chat not found"):
-                conversation_data.export_chat_history("invalid_chat", "json")
-
-def test_export_chat_history_defaults_to_txt(conversation_data, sample_conversations, temp_dir):
+    with pytest.raises(ValueError, match="Chat invalid_chat not found"):
+        conversation_data.export_chat_history("invalid_chat", "json")
+
+def test_export_chat_history_missing_file(conversation_data, temp_dir):
+    """Test exporting when conversations.json does not exist."""
+    with pytest.raises(ValueError, match="No conversations.json found"):
+        conversation_data.export_chat_history("test_chat", "json")
+
+def test_export_chat_history_defaults_to_txt(conversation_data, conversations_file, temp_dir):
     """Test that any non-JSON format (like markdown) defaults to TXT format."""
     chat_id = "test_chat"
-    
-    # Create necessary directories
     exports_dir = os.path.join(os.path.dirname(conversation_data.config.research_folder), 'exports')
-    os.makedirs(exports_dir, exist_ok=True)
-    
-    # Mock file operations
-    mock_json = json.dumps(sample_conversations)
-    with patch("builtins.open", mock_open(read_data=mock_json)) as mock_file:
-        with patch("os.path.exists") as mock_exists:
-            mock_exists.return_value = True
-            
-            # Any non-JSON format should create a TXT file
-            output_path = conversation_data.export_chat_history(chat_id, "md")
-            assert output_path.endswith(".txt")
-            
-            # Verify the file was opened for writing
-            mock_file.assert_any_call(os.path.join(exports_dir, f"{chat_id}.txt"), "w")
-
-def test_load_chat_data(conversation_data, sample_conversations):
+    
+    # Any non-JSON format should create a TXT file
+    output_path = conversation_data.export_chat_history(chat_id, "md")
+    assert output_path.endswith(".txt")
+    assert output_path == os.path.join(exports_dir, f"{chat_id}.txt")
+    assert os.path.exists(output_path)
+
+def test_load_chat_data(conversation_data, conversations_file):
     """Test loading chat data."""
-    # Mock file operations
-    mock_json = json.dumps(sample_conversations)
-    with patch("builtins.open", mock_open(read_data=mock_json)) as mock_file:
-        with patch("os.path.exists") as mock_exists:
-            mock_exists.return_value = True
-            
-            # Call the method directly on the instance
-            chat_data = conversation_data._load_chat_data()
-            
-            # Verify we got the expected data
-            assert len(chat_data) == 1
-            assert "test_chat" in chat_data
-            messages = chat_data["test_chat"]
-            assert len(messages) == 2
-            
-            # Check that the correct file was opened
-            mock_file.assert_called_once_with(
-                os.path.join(conversation_data.config.convo_folder, "conversations.json"), "r"
-            )
+    chat_data = conversation_data._load_chat_data()
+    
+    # Verify we got the expected data
+    assert len(chat_data) == 1
+    assert "test_chat" in chat_data
+    messages = chat_data["test_chat"]
+    assert len(messages) == 2
+    assert messages[0]["content"]["parts"] == ["Hello"]
+    assert messages[1]["content"]["parts"] == ["Hi there"]
+
+def test_load_chat_data_missing_file(conversation_data):
+    """Test loading chat data when conversations.json does not exist."""
+    assert conversation_data._load_chat_data() == {}
+
+def test_load_chat_data_filters_by_start_date(conversation_data, sample_conversations):
+    """Test that conversations created before the start date are skipped."""
+    recent = dict(sample_conversations[0], id="recent_chat", create_time=1704153600)  # 2024-01-02 UTC
+    conversations = sample_conversations + [recent]
+    os.makedirs(conversation_data.config.convo_folder, exist_ok=True)
+    with open(os.path.join(conversation_data.config.convo_folder, "conversations.json"), "w") as f:
+        json.dump(conversations, f)
+    
+    conversation_data.config.start_date = date(2024, 1, 1)
+    chat_data = conversation_data._load_chat_data()
+    
+    assert list(chat_data) == ["recent_chat"]
+
+def test_iter_chat_data_single_chat(conversation_data, sample_conversations):
+    """Test that single chat mode only yields the requested chat."""
+    other = dict(sample_conversations[0], id="other_chat")
+    os.makedirs(conversation_data.config.convo_folder, exist_ok=True)
+    with open(os.path.join(conversation_data.config.convo_folder, "conversations.json"), "w") as f:
+        json.dump([other] + sample_conversations, f)
+    
+    chats = list(conversation_data._iter_chat_data("test_chat"))
+    
+    assert [chat_id for chat_id, _ in chats] == ["test_chat"]
+    assert len(chats[0][1]) == 2
+
+def test_analyze_single_chat_not_found(conversation_data, conversations_file):
+    """Test that analyzing an unknown chat ID raises a ValueError."""
+    with patch.object(conversation_data, 'analyze_and_save_chat') as mock_analyze:
+        with pytest.raises(ValueError, match="Chat ID missing_chat not found"):
+            conversation_data.analyze_single_chat("missing_chat")
+    mock_analyze.assert_not_called()
+
+def test_iter_conversations_streams_large_exports(conversation_data, conversations_file, sample_conversations):
+    """Test that exports over the size threshold are parsed incrementally."""
+    with patch('conversation_data.STREAM_PARSE_MIN_BYTES', 0), \
+         patch('conversation_data.ijson.items', return_value=iter(sample_conversations)) as mock_items:
+        conversations = list(conversation_data._iter_conversations())
+    
+    mock_items.assert_called_once()
+    assert [conv["id"] for conv in conversations] == ["test_chat"]
+
+@pytest.mark.parametrize("stream_parse_min_bytes", [0, 100 * 1024 * 1024])
+def test_iter_conversations_rejects_non_list_export(conversation_data, config, capsys,
+                                                    stream_parse_min_bytes):
+    """Test that an export that is not a list is reported instead of iterated."""
+    os.makedirs(config.convo_folder, exist_ok=True)
+    with open(os.path.join(config.convo_folder, "conversations.json"), "w") as f:
+        json.dump({"test_chat": {"id": "test_chat"}}, f)
+    
+    with patch('conversation_data.STREAM_PARSE_MIN_BYTES', stream_parse_min_bytes), \
+         patch('conversation_data.ijson.items') as mock_items:
+        conversations = list(conversation_data._iter_conversations())
+    
+    assert conversations == []
+    mock_items.assert_not_called()
+    assert "Expected a list of conversations" in capsys.readouterr().out
+
+def test_export_does_not_create_openai_client(conversation_data, conversations_file):
+    """Test that exporting a chat never builds the OpenAI client."""
+    conversation_data.export_chat_history("test_chat", "json")
+    conversation_data.close()
+    
+    assert 'openai_client' not in vars(conversation_data)
+    assert 'http_client' not in vars(conversation_data)
+
+def test_export_chat_history_txt_long_chat(conversation_data, config):
+    """Test exporting a chat deeper than the recursion limit keeps message order."""
+    count = 3000
+    mapping = {}
+    for i in range(count):
+        mapping[f"msg_{i}"] = {
+            "parent": f"msg_{i - 1}" if i else None,
+            "children": [f"msg_{i + 1}"] if i + 1 < count else [],
+            "message": {
+                "author": {"role": "user" if i % 2 == 0 else "assistant"},
+                "create_time": 1000 + i,
+                "content": {"content_type": "text", "parts": [f"Message number {i}"]}
+            }
+        }
+    os.makedirs(config.convo_folder, exist_ok=True)
+    with open(os.path.join(config.convo_folder, "conversations.json"), "w") as f:
+        json.dump([{"id": "long_chat", "create_time": 1000,
+                    "current_node": f"msg_{count - 1}", "mapping": mapping}], f)
+    
+    output_path = conversation_data.export_chat_history("long_chat", "txt")
+    
+    with open(output_path) as f:
+        content = f.read()
+    assert content.index("Message number 0\n") < content.index("Message number 1\n")
+    assert content.index("Message number 1\n") < content.index(f"Message number {count - 1}\n")
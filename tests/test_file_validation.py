@@ -5,7 +5,7 @@ import pytest
 from unittest.mock import MagicMock, patch, mock_open
 
 from chat_analysis_options import ChatAnalysisOptions
-from file_validator import FileValidator
+from file_validator import FileValidator, StreamingContentCheck
 
 @pytest.fixture
 def temp_dir(tmp_path):
@@ -26,6 +26,9 @@ def sample_args():
     args.trends = None
     args.verify_format = False
     args.chat_id = None
+    args.batch = False
+    args.pack = None
+    args.max_workers = None
     return args
 
 def test_verify_markdown_format(temp_dir, sample_args):
@@ -117,6 +120,22 @@ The USER engaged with the AI
         assert FileValidator.verify_md_format('test.md', debug=True) is False
         mock_print.assert_called()
 
+def test_verify_md_content_without_file():
+    """Test that in-memory verification never touches the filesystem."""
+    with patch('builtins.open', side_effect=AssertionError('file opened')):
+        assert FileValidator.verify_md_content('# 1. Brief Summary\n', 'test.md') is False
+
+def test_streaming_content_check_finds_split_markers():
+    """Test that markers split across streamed pieces are still found."""
+    content = ''.join(f"{section}\nTest\n\n" for section in FileValidator.REQUIRED_SECTIONS)
+    check = StreamingContentCheck()
+    for start in range(0, len(content), 7):
+        check.feed(content[start:start + 7])
+    assert check.verify('test.md') is True
+    
+    check.feed("The USER engaged with the AI")
+    assert check.verify('test.md') is False
+
 def test_verify_md_format_file_error():
     """Test verification when file reading raises an error."""
     with patch('builtins.open', side_effect=Exception('File error')):
@@ -0,0 +1,27 @@
+"""Tests for the shared OpenAI HTTP client setup."""
+
+from unittest.mock import patch
+
+from http_client import create_http_client
+
+def test_create_http_client_sizes_pool_for_workers():
+    """Test that the pool is sized for the workers and uses HTTP/2 without transport retries."""
+    with patch('http_client.httpx.HTTPTransport') as mock_transport, \
+         patch('http_client.httpx.Limits') as mock_limits, \
+         patch('http_client.httpx.Client') as mock_client:
+        client = create_http_client(4)
+
+    mock_limits.assert_called_once_with(max_connections=8, max_keepalive_connections=8)
+    mock_transport.assert_called_once_with(http2=True, limits=mock_limits.return_value)
+    assert mock_client.call_args[1]['transport'] is mock_transport.return_value
+    assert client is mock_client.return_value
+
+def test_create_http_client_keeps_long_read_timeout():
+    """Test that long completions are not cut off while connecting still fails fast."""
+    with patch('http_client.httpx.HTTPTransport'), \
+         patch('http_client.httpx.Timeout') as mock_timeout, \
+         patch('http_client.httpx.Client') as mock_client:
+        create_http_client(4)
+
+    mock_timeout.assert_called_once_with(600.0, connect=10.0)
+    assert mock_client.call_args[1]['timeout'] is mock_timeout.return_value
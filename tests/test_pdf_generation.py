@@ -27,6 +27,9 @@ def sample_args():
     args.trends = None
     args.verify_format = False
     args.chat_id = None
+    args.batch = False
+    args.pack = None
+    args.max_workers = None
     return args
 
 @pytest.fixture
@@ -181,7 +184,7 @@ def test_pdf_generator_options(temp_dir, sample_args, num_chunks, size_limit):
         '--pdf', str(num_chunks),
         '--pdf-dir', os.path.join(temp_dir, "custom_pdfs"),
         '--pdf-size-limit', str(size_limit)
-    ]), patch('chat_analysis_options.PDFGenerator', return_value=mock_pdf_gen):
+    ]), patch('pdf_generator.PDFGenerator', return_value=mock_pdf_gen):
         options = ChatAnalysisOptions()
         options.generate_pdfs()
         mock_generate.assert_called_once_with(num_chunks)
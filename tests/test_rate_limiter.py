@@ -0,0 +1,90 @@
+"""Tests for the OpenAI request rate limiter."""
+
+from unittest.mock import patch
+
+from rate_limiter import RateLimiter
+
+def test_acquire_within_capacity():
+    """Test that requests within capacity are not delayed."""
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=1000)
+
+    with patch('rate_limiter.time.sleep') as mock_sleep:
+        limiter.acquire(100)
+        limiter.acquire(100)
+        mock_sleep.assert_not_called()
+
+def test_acquire_waits_for_request_capacity():
+    """Test that acquiring beyond the request limit waits for a refill."""
+    clock = [0.0]
+
+    def advance(seconds):
+        clock[0] += seconds
+
+    with patch('rate_limiter.time.monotonic', side_effect=lambda: clock[0]), \
+         patch('rate_limiter.time.sleep', side_effect=advance) as mock_sleep:
+        limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=100000)
+        for _ in range(60):
+            limiter.acquire()
+        mock_sleep.assert_not_called()
+
+        # The 61st request needs one second's worth of refill
+        limiter.acquire()
+        mock_sleep.assert_called_once()
+        assert abs(clock[0] - 1.0) < 1e-6
+
+def test_acquire_waits_for_token_capacity():
+    """Test that acquiring beyond the token limit waits for a refill."""
+    clock = [0.0]
+
+    def advance(seconds):
+        clock[0] += seconds
+
+    with patch('rate_limiter.time.monotonic', side_effect=lambda: clock[0]), \
+         patch('rate_limiter.time.sleep', side_effect=advance):
+        limiter = RateLimiter(requests_per_minute=1000, tokens_per_minute=600)
+        limiter.acquire(600)
+
+        # 60 more tokens refill in 6 seconds at 600 tokens/minute
+        limiter.acquire(60)
+        assert abs(clock[0] - 6.0) < 1e-6
+
+def test_acquire_oversized_request():
+    """Test that a request larger than the token limit waits for a full bucket."""
+    clock = [0.0]
+
+    def advance(seconds):
+        clock[0] += seconds
+
+    with patch('rate_limiter.time.monotonic', side_effect=lambda: clock[0]), \
+         patch('rate_limiter.time.sleep', side_effect=advance):
+        limiter = RateLimiter(requests_per_minute=1000, tokens_per_minute=600)
+        limiter.acquire(5000)
+        limiter.acquire(5000)
+        assert abs(clock[0] - 60.0) < 1e-6
+
+def test_reconcile_charges_actual_usage():
+    """Test that usage above the estimate delays later requests."""
+    clock = [0.0]
+
+    def advance(seconds):
+        clock[0] += seconds
+
+    with patch('rate_limiter.time.monotonic', side_effect=lambda: clock[0]), \
+         patch('rate_limiter.time.sleep', side_effect=advance):
+        limiter = RateLimiter(requests_per_minute=1000, tokens_per_minute=600)
+        limiter.acquire(100)
+
+        # The request really used 700 tokens: the bucket is 100 in debt,
+        # so a 60 token request needs 160 tokens (16 seconds) of refill
+        limiter.reconcile(100, 700)
+        limiter.acquire(60)
+        assert abs(clock[0] - 16.0) < 1e-6
+
+def test_reconcile_refunds_overestimate():
+    """Test that usage below the estimate returns capacity to the bucket."""
+    with patch('rate_limiter.time.sleep') as mock_sleep:
+        limiter = RateLimiter(requests_per_minute=1000, tokens_per_minute=600)
+        limiter.acquire(600)
+        limiter.reconcile(600, 100)
+        limiter.acquire(400)
+        mock_sleep.assert_not_called()
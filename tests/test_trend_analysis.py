@@ -49,6 +49,19 @@ def test_trend_processor_initialization(temp_dir):
         assert isinstance(processor.model, str)
         assert isinstance(processor.temperature, (int, float))
 
+def test_trend_processor_uses_given_workers_and_limiter(temp_dir):
+    """Test that the worker count and rate limiter passed in are used for requests."""
+    limiter = MagicMock()
+    with patch.dict(os.environ, {'OPENAI_API_KEY': 'test-key'}):
+        processor = TrendProcessor(output_dir=temp_dir, max_workers=3, rate_limiter=limiter)
+    assert processor.max_workers == 3
+    
+    with patch.object(processor.client.chat.completions, 'create',
+                      return_value=create_mock_completion('yes')):
+        processor._analyze_with_openai("test content", "test.md")
+    
+    limiter.acquire.assert_called_once()
+
 def test_analyze_directory_not_found(trend_processor):
     """Test handling of non-existent directory."""
     with pytest.raises(FileNotFoundError):
@@ -208,3 +221,97 @@ def test_analyze_directory(trend_processor, temp_dir):
                 assert isinstance(data, dict)
                 assert 'loop_completion' in data
                 assert data['loop_completion']['completed'] is True
+
+def test_analyze_directory_uses_cache(trend_processor, temp_dir):
+    """Test that files with cached results are not sent to OpenAI."""
+    for name in ("cached", "new"):
+        with open(os.path.join(temp_dir, f"{name}.md"), "w") as f:
+            f.write(f"# {name}\nSome content")
+    with open(os.path.join(temp_dir, "cached.json"), "w") as f:
+        json.dump({
+            "loop_completion": {"completed": False, "exit_at_step_one": False, "skipped_validation": False},
+            "breakdown": {"exit_step": "step_2", "failure_reason": "none"},
+            "insights": {"novel_patterns": False, "ai_partnership": False}
+        }, f)
+    
+    mock_completion = create_mock_completion(
+        '{"loop_completion":{"completed":true,"exit_at_step_one":false,"skipped_validation":false},'
+        '"breakdown":{"exit_step":"none","failure_reason":"none"},'
+        '"insights":{"novel_patterns":true,"ai_partnership":true}}'
+    )
+    
+    with patch.object(trend_processor.client.chat.completions, 'create', return_value=mock_completion) as mock_create:
+        summary = trend_processor.analyze_directory(temp_dir)
+    
+    mock_create.assert_called_once()
+    assert summary['Total Chats']['Total Analyzed'] == 2
+    assert summary['Breakdown (of engaged)']['Exit Steps'] == {'step_2': 1}
+
+def test_generate_summary_counts(trend_processor):
+    """Test the summary's tallies and rates for a mix of engaged and step-one chats."""
+    stats_list = [
+        {'exit_at_step_one': True},
+        {'completed': 1, 'ai_partnership': True, 'ai_as_critic': True, 'novel_patterns': True},
+        {'completed': 1, 'decision_intelligence': True},
+        {'completed': 0, 'exit_step': 'step_3', 'ai_partnership': True, 'skipped_validation': True},
+        {'completed': 0, 'exit_step': 'step_3', 'ai_as_critic': True},
+        {'completed': 0}
+    ]
+    
+    assert trend_processor._generate_summary(stats_list) == {
+        "Total Chats": {
+            "Total Analyzed": 6,
+            "Step One Exits": 1,
+            "Step One Exit Rate (%)": (1 / 6) * 100,
+            "Engaged Conversations": 5
+        },
+        "Loop Completion (of engaged)": {"Completed (%)": 40.0, "Skipped Validation (%)": 20.0},
+        "Breakdown (of engaged)": {"Exit Steps": {"step_3": 2, "unknown": 1}},
+        "Insights (of engaged)": {
+            "Novel Patterns (%)": 20.0,
+            "AI Partnership (%)": 40.0,
+            "AI as Critic (%)": 40.0,
+            "Decision Intelligence (%)": 20.0,
+            "Partnership Success": {
+                "Partnerships": 2,
+                "Successful Completions with Partnership": 1,
+                "Success Rate of Partnerships (%)": 50.0,
+                "Non-Partnership Success Rate (%)": (1 / 3) * 100
+            },
+            "Critical Thinking": {
+                "AI as Critic Usage": 2,
+                "Successful Completions with AI Critic": 1,
+                "Success Rate with AI Critic (%)": 50.0
+            },
+            "Decision Making": {
+                "AI-Driven Decisions": 1,
+                "Successful Completions with AI-Driven Decisions": 1,
+                "Success Rate with AI-Driven Decisions (%)": 100.0
+            }
+        }
+    }
+
+def test_generate_summary_without_ai_features(trend_processor):
+    """Test that rates with no qualifying chats are reported as zero."""
+    summary = trend_processor._generate_summary([{'completed': 1}, {'completed': 0, 'exit_step': 'step_2'}])
+    
+    insights = summary["Insights (of engaged)"]
+    assert summary["Loop Completion (of engaged)"] == {"Completed (%)": 50.0, "Skipped Validation (%)": 0.0}
+    assert summary["Breakdown (of engaged)"] == {"Exit Steps": {"step_2": 1}}
+    assert insights["Partnership Success"] == {
+        "Partnerships": 0,
+        "Successful Completions with Partnership": 0,
+        "Success Rate of Partnerships (%)": 0,
+        "Non-Partnership Success Rate (%)": 50.0
+    }
+    assert insights["Critical Thinking"]["Success Rate with AI Critic (%)"] == 0
+    assert insights["Decision Making"]["Success Rate with AI-Driven Decisions (%)"] == 0
+
+@pytest.mark.parametrize("stats_list, expected", [
+    ([], {"Total Chats Analyzed": 0}),
+    ([{'exit_at_step_one': True}] * 2,
+     {"Total Chats Analyzed": 2, "Step One Exits": 2, "Engaged Conversations": 0})
+])
+def test_generate_summary_without_engaged_chats(trend_processor, stats_list, expected):
+    """Test the short summaries for no chats and for only step-one exits."""
+    assert trend_processor._generate_summary(stats_list) == expected
@@ -1,10 +1,15 @@
 import os
 import json
+from collections import Counter
+
+import orjson
 
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from openai import OpenAI
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from configuration import Config
+from http_client import create_http_client
+from rate_limiter import RateLimiter
 class TrendProcessor:
     """Handles analysis of markdown files for chat completion statistics.
     
@@ -14,26 +19,44 @@ class TrendProcessor:
     3. Generating statistical summaries
     """
     
-    def __init__(self, output_dir: str = 'analysis', force_reprocess: bool = False):
+    def __init__(self, output_dir: str = 'analysis', force_reprocess: bool = False,
+                 max_workers: Optional[int] = None, rate_limiter: Optional[RateLimiter] = None):
         """Initialize the analysis processor with OpenAI client.
         
         Args:
             output_dir (str): Directory to save analysis JSON files (default: 'analysis')
             force_reprocess (bool): If True, reprocess all files even if cached results exist
+            max_workers (int, optional): Number of files analyzed concurrently
+                (default: the configured max_workers)
+            rate_limiter (RateLimiter, optional): Limiter throttling OpenAI requests
+                (default: one built from the configured RPM/TPM limits)
         """
         self.config = Config()
         if not self.config.openai_api_key:
             raise ValueError("OpenAI API key not found in environment variables")
-            
-        self.client = OpenAI(api_key=self.config.openai_api_key)
+        
+        self.max_workers = max_workers or self.config.max_workers
+        self.rate_limiter = rate_limiter or RateLimiter(
+            self.config.max_requests_per_minute,
+            self.config.max_tokens_per_minute
+        )
+        # Files are analyzed on a thread pool, so share a pooled client sized for it
+        self.http_client = create_http_client(self.max_workers)
+        self.client = OpenAI(api_key=self.config.openai_api_key, http_client=self.http_client)
         self.model = self.config.model
         self.temperature = self.config.temperature
         self.output_dir = output_dir
         self.force_reprocess = force_reprocess
+        # Built once so every request starts with the same system message
+        self.system_message = {"role": "system", "content": self.config.trend_analysis_prompt}
         
         # Ensure output directory exists
         os.makedirs(output_dir, exist_ok=True)
     
+    def close(self) -> None:
+        """Close the pooled HTTP connections used for OpenAI requests."""
+        self.http_client.close()
+    
     def _should_process_file(self, md_path: str) -> bool:
         """Check if a markdown file needs to be processed.
         
@@ -67,32 +90,52 @@ class TrendProcessor:
         Returns:
             dict: Analysis results, either from cache or newly processed
         """
-        filename = os.path.basename(filepath)
-        
         # Check for cached results
         if not self._should_process_file(filepath):
-            json_path = os.path.join(
-                self.output_dir,
-                os.path.splitext(filename)[0] + '.json'
-            )
-            with open(json_path, 'r') as f:
-                data = json.load(f)
-                # Map old format to new format
-                stats = {
-                    'completed': 1 if data.get('loop_completion', {}).get('completed', False) else 0,
-                    'exit_at_step_one': data.get('loop_completion', {}).get('exit_at_step_one', False),
-                    'skipped_validation': data.get('loop_completion', {}).get('skipped_validation', False),
-                    'exit_step': data.get('breakdown', {}).get('exit_step', 'unknown'),
-                    'failure_reason': data.get('breakdown', {}).get('failure_reason', 'unknown'),
-                    'novel_patterns': data.get('insights', {}).get('novel_patterns', False),
-                    'ai_partnership': data.get('insights', {}).get('ai_partnership', False),
-                    'ai_as_critic': data.get('insights', {}).get('ai_as_critic', False),
-                    'decision_intelligence': data.get('insights', {}).get('decision_intelligence', False),
-                    'cached': True
-                }
-                return stats
+            return self._load_cached_stats(filepath)
+        
+        return self._process_new_file(filepath)
+
+    def _load_cached_stats(self, filepath: str) -> Dict:
+        """Load the cached analysis results for a markdown file.
+        
+        Args:
+            filepath (str): Path to the markdown file
+            
+        Returns:
+            dict: Statistics read from the cached JSON analysis
+        """
+        json_path = os.path.join(
+            self.output_dir,
+            os.path.splitext(os.path.basename(filepath))[0] + '.json'
+        )
+        with open(json_path, 'rb') as f:
+            data = orjson.loads(f.read())
+            # Map old format to new format
+            stats = {
+                'completed': 1 if data.get('loop_completion', {}).get('completed', False) else 0,
+                'exit_at_step_one': data.get('loop_completion', {}).get('exit_at_step_one', False),
+                'skipped_validation': data.get('loop_completion', {}).get('skipped_validation', False),
+                'exit_step': data.get('breakdown', {}).get('exit_step', 'unknown'),
+                'failure_reason': data.get('breakdown', {}).get('failure_reason', 'unknown'),
+                'novel_patterns': data.get('insights', {}).get('novel_patterns', False),
+                'ai_partnership': data.get('insights', {}).get('ai_partnership', False),
+                'ai_as_critic': data.get('insights', {}).get('ai_as_critic', False),
+                'decision_intelligence': data.get('insights', {}).get('decision_intelligence', False),
+                'cached': True
+            }
+            return stats
+    
+    def _process_new_file(self, filepath: str) -> Dict:
+        """Analyze a markdown file that has no cached results.
         
-        # Process file if no cache available
+        Args:
+            filepath (str): Path to the markdown file
+            
+        Returns:
+            dict: Newly processed analysis results
+        """
+        filename = os.path.basename(filepath)
         stats = self._process_file(filepath)
         stats['cached'] = False
         
@@ -119,10 +162,11 @@ class TrendProcessor:
             raise FileNotFoundError(f"The directory '{directory}' does not exist.")
         
         # Get list of markdown files
-        md_files = [
-            os.path.join(directory, f) for f in os.listdir(directory)
-            if f.endswith('.md')
-        ]
+        with os.scandir(directory) as entries:
+            md_files = [
+                entry.path for entry in entries
+                if entry.name.endswith('.md') and entry.is_file()
+            ]
         
         if not md_files:
             print("No markdown files found to analyze")
@@ -131,33 +175,49 @@ class TrendProcessor:
         total_files = len(md_files)
         print(f"\nFound {total_files} files to process")
         
-        # Process files in parallel
         stats_list = []
         processed = 0
         cached = 0
         errors = 0
         
-        max_workers = min(os.cpu_count() or 1, len(md_files))
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_file = {
-                executor.submit(self._process_file_with_cache, f): f 
-                for f in md_files
-            }
-            
-            for future in as_completed(future_to_file):
-                try:
-                    stats = future.result()
-                    stats_list.append(stats)
-                    processed += 1
-                    if 'cached' in stats and stats['cached']:
-                        cached += 1
-                    
-                    # Print progress
-                    print(f"Progress: {processed}/{total_files} files ({cached} cached)", end='\r')
-                except Exception as e:
-                    file = future_to_file[future]
-                    print(f"\nError processing {os.path.basename(file)}: {str(e)}")
-                    errors += 1
+        # Cached results are quick local reads, so load them here and only
+        # hand files that need an OpenAI request to the thread pool
+        pending_files = []
+        for f in md_files:
+            if self._should_process_file(f):
+                pending_files.append(f)
+                continue
+            try:
+                stats_list.append(self._load_cached_stats(f))
+                processed += 1
+                cached += 1
+            except Exception as e:
+                print(f"\nError processing {os.path.basename(f)}: {str(e)}")
+                errors += 1
+        
+        # Process the remaining files in parallel
+        if pending_files:
+            # Each file is one OpenAI request, so size the pool for network
+            # concurrency rather than CPU count
+            max_workers = min(self.max_workers, len(pending_files))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                future_to_file = {
+                    executor.submit(self._process_new_file, f): f 
+                    for f in pending_files
+                }
+                
+                for future in as_completed(future_to_file):
+                    try:
+                        stats = future.result()
+                        stats_list.append(stats)
+                        processed += 1
+                        
+                        # Print progress
+                        print(f"Progress: {processed}/{total_files} files ({cached} cached)", end='\r')
+                    except Exception as e:
+                        file = future_to_file[future]
+                        print(f"\nError processing {os.path.basename(file)}: {str(e)}")
+                        errors += 1
         
         # Print final stats
         print(f"\nCompleted: {processed} files processed ({cached} from cache, {errors} errors)")
@@ -173,19 +233,23 @@ class TrendProcessor:
         Returns:
             dict: Detailed analysis of the AI Decision Loop execution
         """
-        system_prompt = self.config.trend_analysis_prompt
-        
         user_prompt = f"Analyze this conversation and return ONLY a JSON object according to the specified format:\n\n{text}"
         
         try:
+            # Wait for rate limit capacity (roughly 4 characters per token)
+            estimated_tokens = (len(self.system_message["content"]) + len(user_prompt)) // 4
+            self.rate_limiter.acquire(estimated_tokens)
             response = self.client.chat.completions.create(
                 model=self.config.trend_analysis_model,
                 messages=[
-                    {"role": "system", "content": system_prompt},
+                    self.system_message,
                     {"role": "user", "content": user_prompt}
                 ],
                 temperature=self.temperature
             )
+            total_tokens = getattr(response.usage, 'total_tokens', None)
+            if isinstance(total_tokens, int):
+                self.rate_limiter.reconcile(estimated_tokens, total_tokens)
             
             result = response.choices[0].message.content.strip()
             
@@ -289,11 +353,6 @@ class TrendProcessor:
         
         analysis = self._analyze_with_openai(md_text, filename)
         
-        # Extract the summary section if it exists
-        import re
-        summary_match = re.search(r'# 1\. Brief Summary\n(.+?)\n#', md_text, re.DOTALL)
-        summary_text = summary_match.group(1).strip() if summary_match else md_text
-        
         # Get the analysis results
         completion = analysis['loop_completion']
         breakdown = analysis['breakdown']
@@ -336,13 +395,32 @@ class TrendProcessor:
                 "Engaged Conversations": 0
             }
         
-        # Initialize counters for engaged chats only
-        completed = sum(1 for s in engaged_chats if s.get('completed', 0) == 1)
-        skipped_validation = sum(1 for s in engaged_chats if s.get('skipped_validation', False))
-        novel_patterns = sum(1 for s in engaged_chats if s.get('novel_patterns', False))
-        ai_partnership = sum(1 for s in engaged_chats if s.get('ai_partnership', False))
-        ai_as_critic = sum(1 for s in engaged_chats if s.get('ai_as_critic', False))
-        decision_intelligence = sum(1 for s in engaged_chats if s.get('decision_intelligence', False))
+        # Tally every counter for engaged chats in a single pass
+        completed = skipped_validation = novel_patterns = 0
+        ai_partnership = ai_as_critic = decision_intelligence = 0
+        partnership_completed = non_partnership_completed = 0
+        critic_completed = decision_completed = 0
+        exit_steps = Counter()
+        for s in engaged_chats:
+            is_completed = s.get('completed', 0) == 1
+            is_partnership = bool(s.get('ai_partnership', False))
+            is_critic = bool(s.get('ai_as_critic', False))
+            is_decision = bool(s.get('decision_intelligence', False))
+            
+            completed += is_completed
+            skipped_validation += bool(s.get('skipped_validation', False))
+            novel_patterns += bool(s.get('novel_patterns', False))
+            ai_partnership += is_partnership
+            ai_as_critic += is_critic
+            decision_intelligence += is_decision
+            
+            if is_completed:
+                partnership_completed += is_partnership
+                non_partnership_completed += not is_partnership
+                critic_completed += is_critic
+                decision_completed += is_decision
+            else:
+                exit_steps[s.get('exit_step', 'unknown')] += 1
         
         def normalize_reason(reason):
             """Normalize failure reasons to avoid duplicates with slightly different wording."""
@@ -365,13 +443,6 @@ class TrendProcessor:
             # Default to the original reason if no match
             return reason.replace(' ', '_')
         
-        # Count exit steps for engaged chats only
-        exit_steps = {}
-        for s in engaged_chats:
-            if s.get('completed', 0) != 1:
-                exit_step = s.get('exit_step', 'unknown')
-                exit_steps[exit_step] = exit_steps.get(exit_step, 0) + 1
-        
         return {
             "Total Chats": {
                 "Total Analyzed": total_chats,
@@ -384,7 +455,7 @@ class TrendProcessor:
                 "Skipped Validation (%)": (skipped_validation / total_engaged) * 100
             },
             "Breakdown (of engaged)": {
-                "Exit Steps": exit_steps
+                "Exit Steps": dict(exit_steps)
             },
             "Insights (of engaged)": {
                 "Novel Patterns (%)": (novel_patterns / total_engaged) * 100,
@@ -393,26 +464,19 @@ class TrendProcessor:
                 "Decision Intelligence (%)": (decision_intelligence / total_engaged) * 100,
                 "Partnership Success": {
                     "Partnerships": ai_partnership,
-                    "Successful Completions with Partnership": sum(1 for s in engaged_chats 
-                        if s.get('ai_partnership', False) and s.get('completed', 0) == 1),
-                    "Success Rate of Partnerships (%)": (sum(1 for s in engaged_chats 
-                        if s.get('ai_partnership', False) and s.get('completed', 0) == 1) / ai_partnership * 100) if ai_partnership > 0 else 0,
-                    "Non-Partnership Success Rate (%)": (sum(1 for s in engaged_chats 
-                        if not s.get('ai_partnership', False) and s.get('completed', 0) == 1) / (total_engaged - ai_partnership) * 100) if (total_engaged - ai_partnership) > 0 else 0
+                    "Successful Completions with Partnership": partnership_completed,
+                    "Success Rate of Partnerships (%)": (partnership_completed / ai_partnership * 100) if ai_partnership > 0 else 0,
+                    "Non-Partnership Success Rate (%)": (non_partnership_completed / (total_engaged - ai_partnership) * 100) if (total_engaged - ai_partnership) > 0 else 0
                 },
                 "Critical Thinking": {
                     "AI as Critic Usage": ai_as_critic,
-                    "Successful Completions with AI Critic": sum(1 for s in engaged_chats 
-                        if s.get('ai_as_critic', False) and s.get('completed', 0) == 1),
-                    "Success Rate with AI Critic (%)": (sum(1 for s in engaged_chats 
-                        if s.get('ai_as_critic', False) and s.get('completed', 0) == 1) / ai_as_critic * 100) if ai_as_critic > 0 else 0
+                    "Successful Completions with AI Critic": critic_completed,
+                    "Success Rate with AI Critic (%)": (critic_completed / ai_as_critic * 100) if ai_as_critic > 0 else 0
                 },
                 "Decision Making": {
                     "AI-Driven Decisions": decision_intelligence,
-                    "Successful Completions with AI-Driven Decisions": sum(1 for s in engaged_chats 
-                        if s.get('decision_intelligence', False) and s.get('completed', 0) == 1),
-                    "Success Rate with AI-Driven Decisions (%)": (sum(1 for s in engaged_chats 
-                        if s.get('decision_intelligence', False) and s.get('completed', 0) == 1) / decision_intelligence * 100) if decision_intelligence > 0 else 0
+                    "Successful Completions with AI-Driven Decisions": decision_completed,
+                    "Success Rate with AI-Driven Decisions (%)": (decision_completed / decision_intelligence * 100) if decision_intelligence > 0 else 0
                 }
             }
         }